@@ -1,17 +1,19 @@
 # app.py
 
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, session, jsonify
-import asyncio
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, jsonify
 from crawler import WebCrawler
+from crawl_state import load_checkpoint
+from result_store import ResultStore
+from exports import stream_export, match_row, FORMATS as EXPORT_FORMATS, MATCH_HEADER
 from forms import CrawlForm
-import io
-import csv
+from jobs import CrawlJobManager
+from metrics import render_prometheus
 import logging
-from flask_executor import Executor
 import uuid  # For generating unique crawl IDs
-from urllib.parse import urlparse
-import threading
-import time  # Added for time calculations
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'  # Replace with your own secret key
@@ -20,15 +22,64 @@ app.secret_key = 'your_secret_key'  # Replace with your own secret key
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# In-memory storage for results (for simplicity)
-stored_results = {}
-stored_analytics = {}
-stored_links = {}
-crawlers = {}
-matched_items_dict = {}  # Dictionary to store matched items per crawl
-
-# Initialize Flask-Executor
-executor = Executor(app)
+# Live crawls of this process run as jobs on one background event loop, sharing its
+# connection pool, DNS cache and per-host politeness limits; jobs are removed as soon
+# as their crawl ends
+job_manager = CrawlJobManager(
+    max_concurrent_crawls=int(os.environ.get('CRAWLER_MAX_CRAWLS', 4)),
+    connection_limit=int(os.environ.get('CRAWLER_MAX_CONNECTIONS', 100)),
+    per_host_limit=int(os.environ.get('CRAWLER_MAX_PER_HOST', 10))
+)
+
+# Finished and paused crawl results, kept on disk and shared between app processes
+RESULT_STORE_PATH = os.environ.get('RESULT_STORE_PATH', 'crawl_results.db')
+RESULTS_PER_PAGE = 50
+result_store = ResultStore(RESULT_STORE_PATH, retention_days=int(os.environ.get('RESULT_RETENTION_DAYS', 30)))
+
+# Optional process pool shared by all crawls for page analysis; 0 keeps it on the crawl's event loop
+PROCESS_WORKERS = int(os.environ.get('CRAWLER_PROCESS_WORKERS', 0))
+process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS) if PROCESS_WORKERS > 0 else None
+
+# Progress pages poll /progress_status and /matched_items?since= by default. The
+# /progress_stream endpoint keeps a worker busy for as long as a page is open, so only
+# turn it on when the app runs on threaded or async workers, e.g.
+#   CRAWLER_PROGRESS_STREAM=1 gunicorn --worker-class gthread --threads 32 app:app
+PROGRESS_STREAM = os.environ.get('CRAWLER_PROGRESS_STREAM') == '1'
+
+# How often the progress stream checks for changes, and how long it may stay silent
+STREAM_INTERVAL = 1.0
+STREAM_KEEPALIVE = 15
+
+# Only the first N characters of a page are summarized (0 summarizes whole pages)
+SUMMARY_MAX_CHARS = int(os.environ.get('CRAWLER_SUMMARY_MAX_CHARS', 0)) or None
+
+# Optional SQLite file for crawl checkpoints; crawls can then be resumed after a restart
+CRAWL_STATE_PATH = os.environ.get('CRAWL_STATE_PATH')
+
+# Optional on-disk HTTP cache shared by all crawls, so repeat crawls only download changed pages
+CRAWLER_CACHE_PATH = os.environ.get('CRAWLER_CACHE_PATH')
+CRAWLER_CACHE_MAX_MB = int(os.environ.get('CRAWLER_CACHE_MAX_MB', 256))
+
+# Pages are read up to this size; anything longer is truncated
+CRAWLER_MAX_PAGE_MB = int(os.environ.get('CRAWLER_MAX_PAGE_MB', 10))
+
+# Content hashes and results of the last run of each crawl configuration, for crawls
+# that only report changes
+CRAWL_HISTORY_PATH = os.environ.get('CRAWL_HISTORY_PATH', 'crawl_history.db')
+
+def submit_crawl(crawl_id, build_crawler):
+    def save_results(crawler):
+        # Runs before the job is dropped, so the crawl never looks finished without results
+        result_store.save(crawl_id, crawler.iter_results(), crawler.analytics(), crawler.domains.copy())
+
+    job_manager.submit(crawl_id, lambda **kwargs: build_crawler(
+        executor=process_pool,
+        state_path=CRAWL_STATE_PATH,
+        cache_path=CRAWLER_CACHE_PATH,
+        cache_max_bytes=CRAWLER_CACHE_MAX_MB * 1024 * 1024,
+        max_page_bytes=CRAWLER_MAX_PAGE_MB * 1024 * 1024,
+        **kwargs
+    ), save_results)
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -39,93 +90,80 @@ def index():
         words = [word.strip() for word in form.words.data.split(',')]
         exclude_urls = [url.strip() for url in form.exclude_urls.data.split(',')] if form.exclude_urls.data else []
         depth = form.depth.data
+        workers = form.workers.data
         case_sensitive = form.case_sensitive.data
         exact_match = form.exact_match.data
+        use_robots = form.use_robots.data
+        use_sitemaps = form.use_sitemaps.data
+        history_path = CRAWL_HISTORY_PATH if form.incremental.data else None
 
         # Generate a unique crawl ID
         crawl_id = str(uuid.uuid4())
         session['crawl_id'] = crawl_id
 
-        # Create shared progress dictionary and matched items list
-        progress = {}
-        matched_items = []
-
-        # Run the crawler in a background thread
-        def run_crawler():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            crawler = WebCrawler(
-                start_url=url,
-                search_words=words,
-                max_depth=depth,
-                case_sensitive=case_sensitive,
-                exact_match=exact_match,
-                exclude_urls=exclude_urls,
-                progress_dict=progress,
-                crawl_id=crawl_id,
-                matched_items=matched_items
-            )
-            crawlers[crawl_id] = {'crawler': crawler, 'loop': loop}
-
-            matched_items_dict[crawl_id] = matched_items  # Store matched items list
-
-            # Schedule the crawl coroutine
-            future = asyncio.ensure_future(crawler.crawl())
-            try:
-                loop.run_until_complete(future)
-            except Exception as e:
-                logger.error(f"Crawl error: {e}")
-            finally:
-                loop.close()
-                # Remove crawler from active crawlers
-                crawlers.pop(crawl_id, None)
-                matched_items_dict.pop(crawl_id, None)
-                # Store results in memory
-                stored_results[crawl_id] = crawler.results
-                stored_analytics[crawl_id] = {
-                    'total_pages': crawler.total_pages,
-                    'total_matches': crawler.total_matches,
-                    'word_frequency': crawler.word_frequency.most_common(20),
-                    'duration': time.time() - crawler.start_time,
-                    'total_links': len(crawler.all_links)
-                }
-                stored_links[crawl_id] = list(crawler.all_links)
-
-        threading.Thread(target=run_crawler).start()
+        # Queue the crawl; it starts as soon as a crawl slot is free
+        submit_crawl(crawl_id, lambda **kwargs: WebCrawler(
+            start_url=url,
+            search_words=words,
+            max_depth=depth,
+            case_sensitive=case_sensitive,
+            exact_match=exact_match,
+            exclude_urls=exclude_urls,
+            workers=workers,
+            use_robots=use_robots,
+            use_sitemaps=use_sitemaps,
+            history_path=history_path,
+            summary_max_chars=SUMMARY_MAX_CHARS,
+            **kwargs
+        ))
 
         # Redirect to progress page
         return redirect(url_for('progress'))
     return render_template('index.html', form=form)
 
+@app.route('/resume/<crawl_id>')
+def resume_crawl(crawl_id):
+    if job_manager.get(crawl_id) is None:
+        if not CRAWL_STATE_PATH or load_checkpoint(CRAWL_STATE_PATH, crawl_id) is None:
+            flash('No saved crawl found to resume.', 'error')
+            return redirect(url_for('index'))
+        # submit_crawl passes state_path (and crawl_id) along with the other crawl options
+        submit_crawl(crawl_id, lambda **kwargs: WebCrawler.from_checkpoint(**kwargs))
+    session['crawl_id'] = crawl_id
+    return redirect(url_for('progress'))
+
 @app.route('/progress')
 def progress():
     crawl_id = session.get('crawl_id')
     if not crawl_id:
         return redirect(url_for('index'))
-    return render_template('progress.html')
-
-@app.route('/progress_status')
-def progress_status():
-    crawl_id = session.get('crawl_id')
-    if not crawl_id:
-        return jsonify({'status': 'No active crawl.'})
+    return render_template('progress.html', use_stream=PROGRESS_STREAM)
 
-    crawler_info = crawlers.get(crawl_id)
-    if not crawler_info:
-        return jsonify({'status': 'Completed'})
+def crawl_status(crawl_id):
+    job = job_manager.get(crawl_id)
+    if not job:
+        return {'status': 'Completed'}
+    if job.status == 'queued':
+        return {'status': 'Queued', 'queue_position': job_manager.queue_position(crawl_id)}
 
-    crawler = crawler_info['crawler']
-    progress = crawler.progress.get(crawl_id, {})
-    is_paused = not crawler.pause_event.is_set()
+    progress = job.progress.get(crawl_id, {})
+    is_paused = not job.crawler.pause_event.is_set()
 
     status = 'Paused' if is_paused else 'Crawling'
 
-    return jsonify({
+    return {
         'status': status,
         'pages_crawled': progress.get('pages_crawled', 0),
         'pages_to_visit': progress.get('pages_to_visit', 0),
         'total_matches': progress.get('total_matches', 0)
-    })
+    }
+
+@app.route('/progress_status')
+def progress_status():
+    crawl_id = session.get('crawl_id')
+    if not crawl_id:
+        return jsonify({'status': 'No active crawl.'})
+    return jsonify(crawl_status(crawl_id))
 
 @app.route('/matched_items')
 def matched_items():
@@ -133,34 +171,90 @@ def matched_items():
     if not crawl_id:
         return jsonify({'status': 'No active crawl.', 'matched_items': []})
 
-    items = matched_items_dict.get(crawl_id, [])
-    # Return the latest matched items
+    # Clients pass the cursor they got last time and only receive newer items
+    since = request.args.get('since', 0, type=int)
+    job = job_manager.get(crawl_id)
+    new_items = job.crawler.results_since(since) if job and job.crawler else []
     return jsonify({
         'status': 'Crawling',
-        'matched_items': items
+        'matched_items': new_items,
+        'next': since + len(new_items)
     })
 
+def sse_event(event, data, event_id=None):
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/progress_stream')
+def progress_stream():
+    # Server-Sent Events: progress changes plus every matched item exactly once. The
+    # event id of a match is its position in the list, so a reconnecting browser
+    # (which sends Last-Event-ID) continues where it left off. Each open stream holds a
+    # worker thread, see PROGRESS_STREAM.
+    crawl_id = session.get('crawl_id')
+    if not crawl_id:
+        return jsonify({'status': 'No active crawl.'})
+    try:
+        cursor = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id', 0))
+    except ValueError:
+        cursor = 0
+
+    def events(cursor):
+        yield f"retry: {int(STREAM_INTERVAL * 1000)}\n\n"
+        last_status = None
+        last_sent = time.monotonic()
+        while True:
+            status = crawl_status(crawl_id)
+            job = job_manager.get(crawl_id)
+            items = job.crawler.results_since(cursor) if job and job.crawler else []
+            for item in items:
+                cursor += 1
+                yield sse_event('match', item, cursor)
+            if status != last_status:
+                yield sse_event('progress', status)
+                last_status = status
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent > STREAM_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            if status['status'] == 'Completed':
+                return
+            time.sleep(STREAM_INTERVAL)
+
+    return Response(events(cursor), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics/<crawl_id>')
+def crawl_metrics(crawl_id):
+    # Live metrics while the crawl runs, the stored snapshot once it has finished.
+    # ?format=prometheus returns the Prometheus text format instead of JSON.
+    job = job_manager.get(crawl_id)
+    if job and job.crawler:
+        snapshot = job.crawler.metrics.snapshot()
+    else:
+        snapshot = (result_store.analytics(crawl_id) or {}).get('metrics')
+    if snapshot is None:
+        return jsonify({'status': 'Unknown crawl.'}), 404
+
+    if request.args.get('format') == 'prometheus':
+        return Response(render_prometheus(snapshot, crawl_id=crawl_id), mimetype='text/plain; version=0.0.4')
+    return jsonify(snapshot)
+
 @app.route('/stop_crawl', methods=['POST'])
 def stop_crawl():
     crawl_id = session.get('crawl_id')
     if not crawl_id:
         return jsonify({'status': 'No active crawl.'})
 
-    crawler_info = crawlers.get(crawl_id)
-    if crawler_info:
-        crawler = crawler_info['crawler']
-        crawler.pause()
+    job = job_manager.get(crawl_id)
+    if job and job.crawler:
+        crawler = job.crawler
+        job_manager.pause(job)
 
         # Store current results and analytics
-        stored_results[crawl_id] = crawler.results
-        stored_analytics[crawl_id] = {
-            'total_pages': crawler.total_pages,
-            'total_matches': crawler.total_matches,
-            'word_frequency': crawler.word_frequency.most_common(20),
-            'duration': time.time() - crawler.start_time,
-            'total_links': len(crawler.all_links)
-        }
-        stored_links[crawl_id] = list(crawler.all_links)
+        result_store.save(crawl_id, crawler.iter_results(), crawler.analytics(), crawler.domains.copy())
 
         return jsonify({'status': 'Crawl paused.'})
     else:
@@ -172,10 +266,9 @@ def continue_crawl():
     if not crawl_id:
         return jsonify({'status': 'No active crawl.'})
 
-    crawler_info = crawlers.get(crawl_id)
-    if crawler_info:
-        crawler = crawler_info['crawler']
-        crawler.resume()
+    job = job_manager.get(crawl_id)
+    if job and job.crawler:
+        job_manager.resume(job)
         return jsonify({'status': 'Crawl resumed.'})
     else:
         return jsonify({'status': 'No active crawl.'})
@@ -187,8 +280,10 @@ def results():
         flash('No crawl session found.', 'error')
         return redirect(url_for('index'))
 
-    results = stored_results.get(crawl_id, [])
-    analytics = stored_analytics.get(crawl_id)
+    page = max(1, request.args.get('page', 1, type=int))
+    results = result_store.page(crawl_id, page, RESULTS_PER_PAGE)
+    pages = max(1, -(-result_store.count(crawl_id) // RESULTS_PER_PAGE))
+    analytics = result_store.analytics(crawl_id)
 
     if not analytics:
         logger.error('Analytics data not found.')
@@ -199,10 +294,12 @@ def results():
             "total_matches": 0,
             "word_frequency": [],
             "duration": 0,
-            "total_links": 0
+            "total_links": 0,
+            "cache_hits": 0,
+            "cache_hit_ratio": 0
         }
 
-    return render_template('results.html', results=results, analytics=analytics)
+    return render_template('results.html', results=results, analytics=analytics, page=page, pages=pages, crawl_id=crawl_id)
 
 @app.route('/download/<file_type>')
 def download(file_type):
@@ -211,48 +308,44 @@ def download(file_type):
         flash('No crawl session found.', 'error')
         return redirect(url_for('index'))
 
-    csv_data = io.StringIO()
-    writer = csv.writer(csv_data)
+    # ?format=csv|jsonl and ?compress=gzip; the file is streamed while it is generated
+    file_format = request.args.get('format', 'csv')
+    compress = request.args.get('compress') == 'gzip'
+    if file_format not in EXPORT_FORMATS:
+        flash('Invalid export format requested.', 'error')
+        return redirect(url_for('results'))
 
+    results = result_store.iter_results(crawl_id)
+    records = None  # JSONL records, where they carry more than the CSV rows
     if file_type == 'domains':
-        domains = set(urlparse(link).netloc for link in stored_links.get(crawl_id, []))
-        writer.writerow(['Domain'])
-        for domain in domains:
-            writer.writerow([domain])
-        filename = 'unique_domains.csv'
+        header = ['Domain']
+        rows = ([domain] for domain in result_store.domains(crawl_id))
+        filename = 'unique_domains'
     elif file_type == 'urls':
-        urls = [result['url'] for result in stored_results.get(crawl_id, [])]
-        writer.writerow(['URL'])
-        for url in urls:
-            writer.writerow([url])
-        filename = 'crawled_urls.csv'
+        header = ['URL']
+        rows = ([result['url']] for result in results)
+        filename = 'crawled_urls'
     elif file_type == 'dates':
-        dates = [result['date'] or 'Not found' for result in stored_results.get(crawl_id, [])]
-        writer.writerow(['Date'])
-        for date in dates:
-            writer.writerow([date])
-        filename = 'release_dates.csv'
+        header = ['Date']
+        rows = ([result['date'] or 'Not found'] for result in results if 'alias_of' not in result)
+        records = ({'url': result['url'], 'date': result['date']} for result in results if 'alias_of' not in result)
+        filename = 'release_dates'
     elif file_type == 'matches':
-        results = stored_results.get(crawl_id, [])
-        writer.writerow(['URL', 'Matches', 'Date', 'Summary'])
-        for result in results:
-            writer.writerow([
-                result['url'],
-                ', '.join(result['matches']),
-                result['date'] or 'Not found',
-                result['summary']
-            ])
-        filename = 'matched_items.csv'
+        # Crawls that only report changes also say what changed about each page
+        incremental = 'changes' in (result_store.analytics(crawl_id) or {})
+        header = MATCH_HEADER + (['Change'] if incremental else [])
+        rows = (match_row(result, incremental) for result in results)
+        records = results
+        filename = 'matched_items'
     else:
         flash('Invalid file type requested.', 'error')
         return redirect(url_for('results'))
 
-    csv_data.seek(0)
-    return send_file(
-        io.BytesIO(csv_data.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
+    chunks, extension, mimetype = stream_export(header, rows, file_format, compress, records)
+    return Response(
+        chunks,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{extension}'}
     )
 
 if __name__ == '__main__':
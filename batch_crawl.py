@@ -0,0 +1,286 @@
+# batch_crawl.py
+#
+# Crawls a list of sites without the web UI. Seeds are split by host over worker
+# processes, each running many crawls on its own event loop with one shared connection
+# pool and per-host scheduler, and every match is streamed to a JSONL or CSV file.
+#
+#   python batch_crawl.py seeds.txt --keywords "کتاب,python" --processes 8 --output matches.jsonl.gz
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import uuid
+import zlib
+from urllib.parse import urlparse
+
+from crawler import WebCrawler
+from exports import stream_export, match_row, FORMATS as EXPORT_FORMATS, MATCH_HEADER
+from host_scheduler import HostScheduler
+from jobs import open_shared_session
+
+logger = logging.getLogger(__name__)
+
+HEADER = ['Seed'] + MATCH_HEADER
+# Crawls with a history only report changes, so they also say what changed about each page
+INCREMENTAL_HEADER = HEADER + ['Change']
+
+
+def read_lines(path):
+    # Non-empty lines without '#' comments
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                yield line
+
+
+def read_seeds(path):
+    # In file order without repeats
+    return list(dict.fromkeys(line if '://' in line else 'https://' + line for line in read_lines(path)))
+
+
+def shard_seeds(seeds, shards):
+    # A host (netloc, as the host scheduler sees it) always lands in the same shard, so
+    # its politeness limits are enforced by one scheduler; crc32 keeps the assignment
+    # stable between runs
+    buckets = [[] for _ in range(shards)]
+    for seed in seeds:
+        host = urlparse(seed).netloc.lower()
+        buckets[zlib.crc32(host.encode('utf-8')) % shards].append(seed)
+    return [bucket for bucket in buckets if bucket]
+
+
+class ResultSink:
+    # Stands in for a crawl's matched_items list. Matches wait here until drain() hands
+    # them to the writer's bounded queue, which blocks while the writer is behind.
+    def __init__(self, results, seed):
+        self.results = results
+        self.seed = seed
+        self.pending = []
+
+    def append(self, result):
+        self.pending.append(('result', {'seed': self.seed, **result}))
+
+    def put_all(self, messages):
+        for message in messages:
+            self.results.put(message)
+
+    async def drain(self):
+        messages, self.pending = self.pending, []
+        if messages:
+            # Off the event loop, so a full queue only holds up this crawl's worker
+            await asyncio.to_thread(self.put_all, messages)
+
+
+class BatchCrawler(WebCrawler):
+    # Hands each page's matches to the writer before taking the next page, so crawls
+    # slow down rather than pile up matches in memory when the output falls behind
+    async def process_url(self, url, depth):
+        await super().process_url(url, depth)
+        await self.matched_items.drain()
+
+
+async def crawl_seed(seed, options, session, scheduler, results):
+    started = time.time()
+    summary = {'seed': seed, 'pages': 0, 'matches': 0}
+    sink = ResultSink(results, seed)
+    try:
+        crawler = BatchCrawler(
+            start_url=seed,
+            search_words=options['keywords'],
+            max_depth=options['depth'],
+            case_sensitive=options['case_sensitive'],
+            exact_match=options['exact_match'],
+            exclude_urls=options['exclude_urls'],
+            crawl_id=str(uuid.uuid4()),
+            matched_items=sink,
+            workers=options['workers'],
+            session=session,
+            host_scheduler=scheduler,
+            use_robots=options['use_robots'],
+            use_sitemaps=options['use_sitemaps'],
+            cache_path=options['cache_path'],
+            history_path=options['history_path'],
+            max_page_bytes=options['max_page_bytes'],
+            summary_max_chars=options['summary_max_chars']
+        )
+        crawler.loop = asyncio.get_running_loop()
+        await crawler.crawl()
+        await sink.drain()  # Removed matches are only added once the crawl has finished
+        summary['pages'] = crawler.total_pages
+        summary['matches'] = len(crawler.results)
+    except Exception as e:
+        logger.error(f"Crawl of {seed} failed: {e}")
+        summary['error'] = str(e)
+    summary['duration'] = time.time() - started
+    await asyncio.to_thread(results.put, ('crawl', summary))
+
+
+async def crawl_shard(seeds, options, results):
+    session = open_shared_session(options['connections'], options['per_host'])
+    scheduler = HostScheduler(max_concurrency=options['per_host'])
+    pending = iter(seeds)
+
+    async def run_crawls():
+        # Crawlers are built one at a time as slots free up, not all upfront
+        for seed in pending:
+            await crawl_seed(seed, options, session, scheduler, results)
+
+    try:
+        await asyncio.gather(*(run_crawls() for _ in range(min(options['crawls_per_process'], len(seeds)))))
+    finally:
+        await session.close()
+
+
+def run_shard(index, seeds, options, results):
+    # Entry point of a worker process
+    logging.basicConfig(level=options['log_level'], format=f'%(asctime)s [shard {index}] %(levelname)s %(message)s',
+                        force=True)
+    try:
+        asyncio.run(crawl_shard(seeds, options, results))
+    finally:
+        results.put(('done', index))
+
+
+def iter_records(results, processes, totals):
+    # Matched items from the workers until each has said it is done. A worker that dies
+    # without saying so is noticed once the queue stays empty. Ctrl-C stops the workers
+    # but ends the items normally, so everything received so far is still written out.
+    running = len(processes)
+    interrupted = False
+    while running:
+        try:
+            kind, payload = results.get(timeout=1)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                if not interrupted:
+                    logger.error(f"{running} worker process(es) exited without finishing")
+                return
+            continue
+        except KeyboardInterrupt:
+            interrupted = True
+            logger.warning("Interrupted, stopping the workers")
+            for process in processes:
+                process.terminate()
+            continue
+        if kind == 'result':
+            totals['matches'] += 1
+            yield payload
+        elif kind == 'crawl':
+            totals['crawls'] += 1
+            totals['pages'] += payload['pages']
+            totals['failed'] += 'error' in payload
+            logger.info(f"Finished {payload['seed']}: {payload['pages']} pages, {payload['matches']} matches "
+                        f"in {payload['duration']:.1f}s")
+        elif kind == 'done':
+            running -= 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Crawl many sites for keywords and stream the matches to a file.')
+    parser.add_argument('seeds', help="File with one start URL (or host) per line; '#' starts a comment")
+    parser.add_argument('--keywords', help='Comma-separated search words')
+    parser.add_argument('--keywords-file', help='File with one search word per line')
+    parser.add_argument('--output', default='-', help="Output file, '-' for stdout; a .gz suffix compresses it")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), help='Output format (default: from the file name, else jsonl)')
+    parser.add_argument('--gzip', action='store_true', help='Compress the output')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--crawls-per-process', type=int, default=8, help='Crawls running at once in each process')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=10, help='Concurrent fetches per crawl')
+    parser.add_argument('--connections', type=int, default=100, help='Connection pool size per process')
+    parser.add_argument('--per-host', type=int, default=10, help='Concurrent requests per host')
+    parser.add_argument('--exclude', default='', help='Comma-separated URL substrings to skip')
+    parser.add_argument('--case-sensitive', action='store_true')
+    parser.add_argument('--exact-match', action='store_true')
+    parser.add_argument('--no-robots', action='store_true', help='Ignore robots.txt')
+    parser.add_argument('--sitemaps', action='store_true', help='Also seed each crawl from its sitemaps')
+    parser.add_argument('--cache-path', help='SQLite HTTP cache shared by all crawls')
+    parser.add_argument('--history-path', help='SQLite crawl history; only changes since the last run are reported')
+    parser.add_argument('--max-page-mb', type=int, default=10)
+    parser.add_argument('--summary-max-chars', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    words = [word.strip() for word in args.keywords.split(',')] if args.keywords else []
+    if args.keywords_file:
+        words.extend(read_lines(args.keywords_file))
+    args.words = [word for word in words if word]
+    if not args.words:
+        parser.error('no search words given (use --keywords or --keywords-file)')
+    if args.processes < 1 or args.crawls_per_process < 1:
+        parser.error('--processes and --crawls-per-process must be at least 1')
+
+    name = args.output[:-3] if args.output.endswith('.gz') else args.output
+    args.gzip = args.gzip or args.output.endswith('.gz')
+    if args.format is None:
+        args.format = 'csv' if name.endswith('.csv') else 'jsonl'
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    seeds = read_seeds(args.seeds)
+    shards = shard_seeds(seeds, args.processes)
+    options = {
+        'keywords': args.words,
+        'depth': args.depth,
+        'case_sensitive': args.case_sensitive,
+        'exact_match': args.exact_match,
+        'exclude_urls': [url.strip() for url in args.exclude.split(',') if url.strip()],
+        'workers': args.workers,
+        'crawls_per_process': args.crawls_per_process,
+        'connections': args.connections,
+        'per_host': args.per_host,
+        'use_robots': not args.no_robots,
+        'use_sitemaps': args.sitemaps,
+        'cache_path': args.cache_path,
+        'history_path': args.history_path,
+        'max_page_bytes': args.max_page_mb * 1024 * 1024,
+        'summary_max_chars': args.summary_max_chars or None,
+        # The crawls themselves log every page, so workers only report problems by default
+        'log_level': logging.INFO if args.verbose else logging.WARNING
+    }
+    logger.info(f"Crawling {len(seeds)} sites in {len(shards)} process(es)")
+
+    # Bounded, so workers wait rather than pile up rows when the output is slow
+    results = multiprocessing.Queue(maxsize=10000)
+    processes = [multiprocessing.Process(target=run_shard, args=(index, shard, options, results),
+                                         name=f'crawl-shard-{index}', daemon=True)
+                 for index, shard in enumerate(shards)]
+    for process in processes:
+        process.start()
+
+    started = time.time()
+    totals = {'crawls': 0, 'pages': 0, 'matches': 0, 'failed': 0}
+    incremental = args.history_path is not None
+    records = iter_records(results, processes, totals)
+    rows = ([record['seed']] + match_row(record, incremental) for record in records)
+    chunks, _, _ = stream_export(INCREMENTAL_HEADER if incremental else HEADER, rows, args.format, args.gzip, records)
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+            output.flush()
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    for process in processes:
+        process.join()
+
+    elapsed = time.time() - started
+    logger.info(f"{totals['crawls']} crawls, {totals['pages']} pages, {totals['matches']} matches in {elapsed:.1f}s "
+                f"({totals['pages'] / elapsed if elapsed else 0:.1f} pages/sec)")
+    failed = totals['failed'] or sum(process.exitcode != 0 for process in processes)
+    return 1 if failed or totals['crawls'] < len(seeds) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# benchmarks/bench_analysis.py
+#
+# Microbenchmarks for the per-page analysis steps: HTML extraction (every available
+# backend), find_matches, extract_date and summarize_text.
+#
+#   python benchmarks/bench_analysis.py --pages 200 --output analysis.json
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import PageAnalyzer  # noqa: E402
+from extraction import EXTRACTORS, extract_page  # noqa: E402
+from benchmarks.corpus import generate_corpus  # noqa: E402
+from benchmarks.report import write_report  # noqa: E402
+
+SEARCH_WORDS = ['کتاب', 'اقتصاد', 'دانشگاه', 'news', 'python']
+
+
+def measure(function, inputs, rounds):
+    # Best of several rounds over all inputs, as microseconds per call
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for value in inputs:
+            function(value)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    per_call = best / len(inputs)
+    return {'us_per_call': per_call * 1e6, 'calls_per_sec': 1 / per_call if per_call else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the page analysis steps.')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--words', type=int, default=400)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON file for the results, '-' for stdout")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(pages=args.pages, seed=args.seed, words=args.words)
+    analyzer = PageAnalyzer(SEARCH_WORDS)
+    texts = [extract_page(analyzer.extractor, html_content, False)[0] for html_content in corpus]
+    normalized = [analyzer.normalizer.normalize(text) for text in texts]
+    results = {}
+    for name, extractor_class in EXTRACTORS.items():
+        extractor = extractor_class()
+        results[f'extract[{name}]'] = measure(lambda html_content: extract_page(extractor, html_content), corpus, args.rounds)
+    results['normalize'] = measure(analyzer.normalizer.normalize, texts, args.rounds)
+    results['find_matches'] = measure(analyzer.find_matches, normalized, args.rounds)
+    results['extract_date'] = measure(analyzer.extract_date, texts, args.rounds)
+    # The stem cache warms up during the first round; later rounds show the steady state
+    results['summarize_text'] = measure(analyzer.summarize_text, normalized, args.rounds)
+    results['analyze'] = measure(lambda html_content: analyzer.analyze(html_content, 'http://localhost/'), corpus, args.rounds)
+
+    for name, result in results.items():
+        print(f"{name:<20} {result['us_per_call']:12.1f} us/call {result['calls_per_sec']:12.1f} calls/sec")
+    if args.output:
+        config = dict(vars(args), search_words=SEARCH_WORDS)
+        del config['output']
+        write_report(args.output, 'analysis', config, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_crawl.py
+#
+# Crawls a local fixture site end to end and reports pages/sec, p50/p99 page
+# latency, peak RSS and CPU time.
+#
+#   python benchmarks/bench_crawl.py --pages 2000 --fanout 10 --latency 20 --output crawl.json
+
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import WebCrawler  # noqa: E402
+from benchmarks.fixture_site import FixtureSite  # noqa: E402
+from benchmarks.report import percentile, write_report  # noqa: E402
+
+SEARCH_WORDS = ['کتاب', 'اقتصاد', 'دانشگاه', 'news', 'python']
+
+
+class TimedCrawler(WebCrawler):
+    # Records how long each crawled page took from dequeue to links queued
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_latencies = []
+
+    async def process_url(self, url, depth):
+        pages = self.total_pages
+        start = time.perf_counter()
+        await super().process_url(url, depth)
+        if self.total_pages != pages:
+            self.page_latencies.append(time.perf_counter() - start)
+
+
+def cpu_times():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+def run_crawl(start_url, args):
+    crawler = TimedCrawler(
+        start_url, SEARCH_WORDS,
+        max_depth=args.depth,
+        workers=args.workers,
+        process_workers=args.process_workers,
+        parser_backend=args.parser
+    )
+    cpu_before, children_before = cpu_times()
+    start = time.perf_counter()
+    results, analytics, _ = asyncio.run(crawler.crawl())
+    elapsed = time.perf_counter() - start
+    cpu_after, children_after = cpu_times()
+
+    latencies = crawler.page_latencies
+    return {
+        'pages': analytics['total_pages'],
+        'results': len(results),
+        'seconds': elapsed,
+        'pages_per_sec': analytics['total_pages'] / elapsed if elapsed else 0,
+        'latency_p50_ms': percentile(latencies, 0.50) * 1000 if latencies else None,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+        'cpu_seconds': cpu_after - cpu_before,
+        # Pool workers are only accounted once they have exited
+        'child_cpu_seconds': children_after - children_before,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark a full crawl against a local fixture site.')
+    parser.add_argument('--pages', type=int, default=1000, help='pages on the fixture site')
+    parser.add_argument('--fanout', type=int, default=10, help='links per page')
+    parser.add_argument('--words', type=int, default=400, help='words per page')
+    parser.add_argument('--latency', type=float, default=0.0, help='server latency per page in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random latency variation in milliseconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--process-workers', type=int, default=0)
+    parser.add_argument('--parser', default='auto', help='extraction backend')
+    parser.add_argument('--output', help="JSON file for the results, '-' for stdout")
+    args = parser.parse_args()
+
+    site = dict(pages=args.pages, fanout=args.fanout, words=args.words,
+                latency=args.latency / 1000, jitter=args.jitter / 1000, seed=args.seed)
+    with FixtureSite(**site) as fixture:
+        results = run_crawl(fixture.start_url, args)
+
+    print(f"{results['pages']} pages in {results['seconds']:.2f}s: {results['pages_per_sec']:.1f} pages/sec, "
+          f"p50 {results['latency_p50_ms']:.1f} ms, p99 {results['latency_p99_ms']:.1f} ms, "
+          f"CPU {results['cpu_seconds']:.2f}s, peak RSS {results['peak_rss_mb']:.1f} MB")
+    if args.output:
+        config = dict(vars(args), search_words=SEARCH_WORDS)
+        del config['output']
+        write_report(args.output, 'crawl', config, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_extraction.py
+#
+# Checks that every available extraction backend returns the same text and links
+# as BeautifulSoup on the fixture corpus, then reports pages/sec for each backend.
+#
+#   python benchmarks/bench_extraction.py --pages 500
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import EXTRACTORS, extract_page  # noqa: E402
+from benchmarks.corpus import generate_corpus  # noqa: E402
+
+
+def check_parity(corpus):
+    reference = EXTRACTORS['bs4']()
+    mismatches = {}
+    for name, extractor_class in EXTRACTORS.items():
+        extractor = extractor_class()
+        failed = []
+        for index, html_content in enumerate(corpus):
+            if extract_page(extractor, html_content) != extract_page(reference, html_content):
+                failed.append(index)
+        mismatches[name] = failed
+    return mismatches
+
+
+def benchmark(corpus, rounds=3):
+    pages_per_sec = {}
+    for name, extractor_class in EXTRACTORS.items():
+        extractor = extractor_class()
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for html_content in corpus:
+                extract_page(extractor, html_content)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        pages_per_sec[name] = len(corpus) / best
+    return pages_per_sec
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare HTML extraction backends.')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--words', type=int, default=400)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(pages=args.pages, words=args.words)
+    mismatches = check_parity(corpus)
+    for name, pages_per_sec in sorted(benchmark(corpus, args.rounds).items(), key=lambda item: -item[1]):
+        status = 'ok' if not mismatches[name] else f'{len(mismatches[name])} mismatching pages: {mismatches[name][:10]}'
+        print(f'{name:<12} {pages_per_sec:10.1f} pages/sec   parity: {status}')
+    return 1 if any(mismatches.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
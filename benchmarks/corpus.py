@@ -0,0 +1,49 @@
+# benchmarks/corpus.py
+
+import random
+
+PERSIAN_WORDS = ['کتاب', 'خبر', 'ایران', 'بازار', 'سلام', 'دنیا', 'اقتصاد', 'ورزش', 'فرهنگ', 'کتاب‌ها',
+                 'می‌رود', 'دانشگاه', 'تهران', 'سیاست', 'فناوری']
+ENGLISH_WORDS = ['news', 'market', 'python', 'crawler', 'data', 'world', 'economy', 'sport', 'culture',
+                 'science', 'report', 'update']
+PERSIAN_DATES = ['شنبه ۱۲ مهر ۱۴۰۲', 'دوشنبه ۳ اردیبهشت ۱۴۰۱', '۱۴۰۲/۰۷/۱۲', '1401/02/03']
+
+# Hand-written pages covering markup the extractors must agree on
+EDGE_CASES = [
+    '',
+    '<p>no html or body tags</p>',
+    '<html><head><title>عنوان</title></head><body></body></html>',
+    '<html><body><!-- a comment --><p>before<!-- inline -->after</p></body></html>',
+    '<html><body><script>var x = "<a href=/fake>";</script><style>p {}</style><p>text</p></body></html>',
+    '<html><body><p>entities &amp; &lt;tags&gt; &nbsp;&copy; &#1740;</p></body></html>',
+    '<html><body><a href="/one">one</a><a href="">empty</a><a>none</a><a href="#frag">frag</a></body></html>',
+    '<html><body><div><p>unclosed <b>bold <i>italic</div><p>next</body></html>',
+    '<html><body><ul><li>one<li>two<li>three</ul><table><tr><td>a<td>b</table></body></html>',
+    '<html><body><p>tail <span>inner</span> tail text</p>\n\n   <p>  spaced   out  </p></body></html>',
+    '<html><body><noscript>enable js</noscript><p>سلام‌دنیا</p></body></html>',
+]
+
+
+def generate_page(rnd, index, words=200, fanout=10, site_pages=1000):
+    paragraphs = []
+    for _ in range(max(1, words // 40)):
+        vocabulary = PERSIAN_WORDS if rnd.random() < 0.6 else ENGLISH_WORDS
+        sentence = ' '.join(rnd.choice(vocabulary) for _ in range(40))
+        paragraphs.append(f'<p>{sentence}.</p>')
+    links = ''.join(f'<li><a href="/page/{rnd.randrange(site_pages)}">{rnd.choice(ENGLISH_WORDS)}</a></li>'
+                    for _ in range(fanout))
+    return (
+        '<!DOCTYPE html><html lang="fa"><head><meta charset="utf-8">'
+        f'<title>Page {index}</title><style>body {{ direction: rtl; }}</style>'
+        '<script>window.analytics = {"id": 1};</script></head><body>'
+        f'<header><nav><ul>{links}</ul></nav></header>'
+        f'<article><h1>{rnd.choice(PERSIAN_WORDS)} {index}</h1>'
+        f'<span class="date">{rnd.choice(PERSIAN_DATES)}</span>'
+        + ''.join(paragraphs) +
+        '</article><!-- footer --><footer>&copy; 2024</footer></body></html>'
+    )
+
+
+def generate_corpus(pages=200, seed=0, **kwargs):
+    rnd = random.Random(seed)
+    return EDGE_CASES + [generate_page(rnd, i, **kwargs) for i in range(pages)]
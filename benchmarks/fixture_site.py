@@ -0,0 +1,108 @@
+# benchmarks/fixture_site.py
+#
+# Local aiohttp site of synthetic Persian/English pages for crawl benchmarks. Every
+# page is generated from the seed and its index, so the same options always serve
+# the same site.
+#
+#   python benchmarks/fixture_site.py --pages 2000 --fanout 10 --latency 20
+
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web  # noqa: E402
+from benchmarks.corpus import generate_page  # noqa: E402
+
+
+def make_app(pages=1000, fanout=10, words=400, latency=0.0, jitter=0.0, seed=0):
+    # latency and jitter are in seconds; each response waits latency +/- jitter
+    @functools.lru_cache(maxsize=None)
+    def render(index):
+        rnd = random.Random(f'{seed}:{index}')
+        return generate_page(rnd, index, words=words, fanout=fanout, site_pages=pages)
+
+    delays = random.Random(seed)
+
+    async def page(request):
+        index = int(request.match_info['index'])
+        if index >= pages:
+            raise web.HTTPNotFound()
+        delay = latency + (delays.uniform(-jitter, jitter) if jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return web.Response(text=render(index), content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/page/{index:\\d+}', page)
+    return app
+
+
+def free_port(host='127.0.0.1'):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def serve(host, port, **options):
+    web.run_app(make_app(**options), host=host, port=port, print=None, access_log=None)
+
+
+class FixtureSite:
+    # Runs the site in a separate process, so its CPU time and memory don't count
+    # against the crawler being measured
+    def __init__(self, host='127.0.0.1', port=None, **options):
+        self.host = host
+        self.port = port or free_port(host)
+        self.options = options
+        self.process = None
+
+    @property
+    def start_url(self):
+        return f'http://{self.host}:{self.port}/page/0'
+
+    def __enter__(self):
+        self.process = multiprocessing.Process(target=serve, args=(self.host, self.port), kwargs=self.options, daemon=True)
+        self.process.start()
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection((self.host, self.port), timeout=1).close()
+                return self
+            except OSError:
+                if time.monotonic() > deadline or not self.process.is_alive():
+                    self.__exit__(None, None, None)
+                    raise RuntimeError('Fixture site did not start')
+                time.sleep(0.05)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.process.terminate()
+        self.process.join()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic site for crawl benchmarks.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--fanout', type=int, default=10)
+    parser.add_argument('--words', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.0, help='milliseconds per response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='milliseconds of random variation')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(f'Serving http://{args.host}:{args.port}/page/0')
+    serve(args.host, args.port, pages=args.pages, fanout=args.fanout, words=args.words,
+          latency=args.latency / 1000, jitter=args.jitter / 1000, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
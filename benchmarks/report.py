@@ -0,0 +1,36 @@
+# benchmarks/report.py
+
+import json
+import os
+import platform
+import sys
+import time
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an unsorted list
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def write_report(path, benchmark, config, results):
+    # One JSON document per run, so runs before and after a change can be compared
+    report = {'benchmark': benchmark, 'environment': environment(), 'config': config, 'results': results}
+    if path == '-':
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f'Results written to {path}')
@@ -0,0 +1,290 @@
+# crawl_state.py
+
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict, deque
+
+
+class CrawlStateStore:
+    # On-disk crawl state (frontier, URL sets, results and counters) for one crawl.
+    # Writes are buffered and only committed together with the results and counters
+    # they belong to, so a crash never leaves pages marked done whose results are lost.
+    # SQLite runs in WAL mode so checkpoints don't block readers.
+    def __init__(self, path, crawl_id, batch_size=500):
+        self.path = path
+        self.crawl_id = crawl_id
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS crawls (
+                crawl_id TEXT PRIMARY KEY,
+                config TEXT NOT NULL,
+                stats TEXT NOT NULL,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crawl_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS frontier_crawl ON frontier (crawl_id, id);
+            CREATE TABLE IF NOT EXISTS url_sets (
+                crawl_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (crawl_id, name, url)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crawl_id TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_crawl ON results (crawl_id, id);
+        ''')
+        self.pending_frontier = []
+        self.pending_done = []
+        self.pending_urls = []
+        self.flushes = 0
+        # Called instead of committing the buffered writes on their own; the crawler sets
+        # it to its checkpoint, which passes them back to checkpoint() with its results
+        self.on_flush = None
+
+    def pending_writes(self):
+        return len(self.pending_frontier) + len(self.pending_done) + len(self.pending_urls)
+
+    def needs_flush(self):
+        return self.pending_writes() >= self.batch_size
+
+    def flush(self):
+        if not self.pending_writes():
+            return
+        if self.on_flush is not None:
+            self.on_flush()
+            return
+        with self.conn:
+            self.write_pending()
+        self.clear_pending()
+
+    def write_pending(self):
+        # Runs inside the caller's transaction
+        self.conn.executemany('INSERT INTO frontier (crawl_id, url, depth) VALUES (?, ?, ?)', self.pending_frontier)
+        self.conn.executemany('DELETE FROM frontier WHERE id = ?', self.pending_done)
+        self.conn.executemany('INSERT OR IGNORE INTO url_sets (crawl_id, name, url) VALUES (?, ?, ?)', self.pending_urls)
+
+    def clear_pending(self):
+        self.pending_frontier = []
+        self.pending_done = []
+        self.pending_urls = []
+        self.flushes += 1
+
+    # Frontier
+
+    def add_frontier(self, url, depth):
+        self.pending_frontier.append((self.crawl_id, url, depth))
+
+    def frontier_done(self, row_id):
+        self.pending_done.append((row_id,))
+
+    def count_frontier(self):
+        row = self.conn.execute('SELECT COUNT(*) FROM frontier WHERE crawl_id = ?', (self.crawl_id,)).fetchone()
+        return row[0] + len(self.pending_frontier)
+
+    def load_frontier(self, after_id, limit):
+        self.flush()
+        return self.conn.execute(
+            'SELECT id, url, depth FROM frontier WHERE crawl_id = ? AND id > ? ORDER BY id LIMIT ?',
+            (self.crawl_id, after_id, limit)
+        ).fetchall()
+
+    # URL sets
+
+    def add_url(self, name, url):
+        self.pending_urls.append((self.crawl_id, name, url))
+
+    def has_url(self, name, url):
+        return self.conn.execute(
+            'SELECT 1 FROM url_sets WHERE crawl_id = ? AND name = ? AND url = ?',
+            (self.crawl_id, name, url)
+        ).fetchone() is not None
+
+    def count_urls(self, name):
+        self.flush()
+        return self.conn.execute(
+            'SELECT COUNT(*) FROM url_sets WHERE crawl_id = ? AND name = ?', (self.crawl_id, name)
+        ).fetchone()[0]
+
+    def iter_urls(self, name, batch=1000):
+        self.flush()
+        last = ''
+        while True:
+            rows = self.conn.execute(
+                'SELECT url FROM url_sets WHERE crawl_id = ? AND name = ? AND url > ? ORDER BY url LIMIT ?',
+                (self.crawl_id, name, last, batch)
+            ).fetchall()
+            if not rows:
+                return
+            for (url,) in rows:
+                yield url
+            last = rows[-1][0]
+
+    # Crawl metadata and results
+
+    def load_crawl(self):
+        row = self.conn.execute('SELECT config, stats, status FROM crawls WHERE crawl_id = ?', (self.crawl_id,)).fetchone()
+        if row is None:
+            return None
+        return {'config': json.loads(row[0]), 'stats': json.loads(row[1]), 'status': row[2]}
+
+    def count_results(self):
+        return self.conn.execute('SELECT COUNT(*) FROM results WHERE crawl_id = ?', (self.crawl_id,)).fetchone()[0]
+
+    def read_results(self, start, limit):
+        # Called from other threads while the crawl runs, so it uses a connection of its own
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute(
+                'SELECT data FROM results WHERE crawl_id = ? ORDER BY id LIMIT ? OFFSET ?', (self.crawl_id, limit, start)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(data) for (data,) in rows]
+
+    def checkpoint(self, config, stats, new_results, status):
+        with self.conn:
+            self.write_pending()
+            self.conn.executemany(
+                'INSERT INTO results (crawl_id, data) VALUES (?, ?)',
+                [(self.crawl_id, json.dumps(result, ensure_ascii=False)) for result in new_results]
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO crawls (crawl_id, config, stats, status, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (self.crawl_id, json.dumps(config, ensure_ascii=False), json.dumps(stats, ensure_ascii=False), status, time.time())
+            )
+        self.clear_pending()
+
+    def restore_interrupted(self):
+        # URLs still in the frontier were not finished before the crawl stopped, so they
+        # must not count as visited when it resumes. Returns how many were reset.
+        self.flush()
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM url_sets WHERE crawl_id = ? AND name = 'visited' AND url IN "
+                "(SELECT url FROM frontier WHERE crawl_id = ?)",
+                (self.crawl_id, self.crawl_id)
+            )
+        return cursor.rowcount
+
+    def clear_urls(self):
+        # The URL sets are only needed to resume; drop them once a crawl has finished
+        self.flush()
+        with self.conn:
+            self.conn.execute('DELETE FROM url_sets WHERE crawl_id = ?', (self.crawl_id,))
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+class PersistentSet:
+    # Set of URLs stored on disk with a bounded in-memory cache of recent members
+    def __init__(self, store, name, cache_size=10000):
+        self.store = store
+        self.name = name
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.size = store.count_urls(name)
+        # Members added since the store last flushed, which a database lookup can't see yet
+        self.unflushed = set()
+        self.flushes = store.flushes
+
+    def __contains__(self, url):
+        if url in self.cache:
+            self.cache.move_to_end(url)
+            return True
+        if self.flushes != self.store.flushes:
+            self.unflushed.clear()
+            self.flushes = self.store.flushes
+        if url in self.unflushed:
+            return True
+        if self.store.has_url(self.name, url):
+            self.remember(url)
+            return True
+        return False
+
+    def add(self, url):
+        if url in self:
+            return
+        self.unflushed.add(url)
+        self.store.add_url(self.name, url)
+        self.remember(url)
+        self.size += 1
+
+    def remember(self, url):
+        self.cache[url] = True
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return self.store.iter_urls(self.name)
+
+
+def load_checkpoint(path, crawl_id):
+    store = CrawlStateStore(path, crawl_id)
+    try:
+        return store.load_crawl()
+    finally:
+        store.close()
+
+
+class PersistentQueue(asyncio.Queue):
+    # FIFO crawl frontier kept on disk. Only a bounded read-ahead buffer lives in memory;
+    # items come out as (url, depth, row_id) and the row is removed once
+    # store.frontier_done(row_id) is called after the URL has been processed.
+    def __init__(self, store, buffer_size=1000):
+        self.store = store
+        self.buffer_size = buffer_size
+        super().__init__()
+        if self._backlog:
+            # Items restored from disk are outstanding work just like freshly put ones
+            self._unfinished_tasks += self._backlog
+            self._finished.clear()
+
+    def _init(self, maxsize):
+        self._queue = deque()
+        self._last_loaded_id = 0
+        self._backlog = self.store.count_frontier()  # Items on disk, not yet buffered
+
+    def _qsize(self):
+        return len(self._queue) + self._backlog
+
+    # asyncio.Queue measures itself by len(self._queue), which only sees the buffer
+    def qsize(self):
+        return self._qsize()
+
+    def empty(self):
+        return self._qsize() == 0
+
+    def _put(self, item):
+        if item is None:
+            self._queue.append(None)  # Shutdown sentinels never go to disk
+            return
+        url, depth = item[:2]
+        self.store.add_frontier(url, depth)
+        self._backlog += 1
+
+    def _get(self):
+        if not self._queue:
+            rows = self.store.load_frontier(self._last_loaded_id, self.buffer_size)
+            self._last_loaded_id = rows[-1][0]
+            self._backlog -= len(rows)
+            self._queue.extend((url, depth, row_id) for row_id, url, depth in rows)
+        return self._queue.popleft()
@@ -2,28 +2,157 @@
 
 import asyncio
 import aiohttp
+import contextlib
+import functools
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
 import time
 from collections import Counter
-import re
 from parsivar import Normalizer, Tokenizer, FindStems
-import jdatetime
 import logging
 import uuid  # For generating unique crawl IDs
+from matcher import KeywordMatcher
+from fingerprint import NearDuplicateIndex, simhash
+from dates import extract_date
+from metrics import CrawlMetrics, StageClock, trace_config
+from discovery import discover_urls, fetch_robots
+from history import CrawlHistory, content_hash, history_key
+from extraction import get_extractor, extract_page, decode_html
+from urls import UrlCanonicalizer
+from http_cache import ResponseCache
+from host_scheduler import HostScheduler, THROTTLE_STATUSES
+from crawl_state import CrawlStateStore, PersistentQueue, PersistentSet, load_checkpoint
 
 logger = logging.getLogger(__name__)
 
+class PageAnalyzer:
+    # CPU-bound part of crawling a page: parsing, normalization, matching and
+    # summarization. Kept separate from WebCrawler so it can run in a worker process.
+    # Upper bound on distinct words whose stems are remembered
+    STEM_CACHE_SIZE = 100000
+
+    def __init__(self, search_words, case_sensitive=False, exact_match=False, parser_backend='auto', summary_max_chars=None,
+                 fingerprints=False):
+        self.search_words = search_words if case_sensitive else [w.lower() for w in search_words]
+        self.case_sensitive = case_sensitive
+        self.exact_match = exact_match
+        # Compiled once per crawl; exact_match searches for plain substrings
+        self.matcher = KeywordMatcher(self.search_words, word_boundary=not exact_match)
+        self.normalizer = Normalizer()
+        self.tokenizer = Tokenizer()
+        self.stemmer = FindStems()
+        # The same vocabulary repeats across the pages of a site, so each word is stemmed once
+        self.stem = functools.lru_cache(maxsize=self.STEM_CACHE_SIZE)(self.stemmer.convert_to_stem)
+        # Optional cap on how much of a page is summarized
+        self.summary_max_chars = summary_max_chars
+        self.extractor = get_extractor(parser_backend)
+        # Whether to add a SimHash of the page text for near-duplicate detection
+        self.fingerprints = fingerprints
+
+    def analyze(self, html_content, url, extract_links=True, find_duplicate=None):
+        # Only compact results are returned so they are cheap to send between processes.
+        # find_duplicate(url, fingerprint) may name an earlier copy of the page, in which
+        # case matching and summarizing are skipped and 'duplicate_of' is set. 'timings'
+        # holds the seconds spent in each stage.
+        clock = StageClock()
+        text, hrefs = extract_page(self.extractor, html_content, extract_links)
+        links = [urljoin(url, href) for href in hrefs]
+        clock.lap('extract')
+        fingerprint = None
+        if self.fingerprints:
+            fingerprint = simhash(text)
+            clock.lap('fingerprint')
+
+        if find_duplicate is not None:
+            duplicate_of = find_duplicate(url, fingerprint)
+            if duplicate_of is not None:
+                return {"match_counts": {}, "date": None, "summary": None, "links": links,
+                        "fingerprint": fingerprint, "duplicate_of": duplicate_of, "timings": clock.timings}
+
+        normalized_text = self.normalizer.normalize(text)
+        clock.lap('normalize')
+        match_counts = self.find_matches(normalized_text)
+        clock.lap('match')
+
+        date = None
+        summary = None
+        if match_counts:
+            date = self.extract_date(text, html_content)
+            clock.lap('date')
+            summary = self.summarize_text(normalized_text)
+            clock.lap('summarize')
+
+        analysis = {"match_counts": match_counts, "date": date, "summary": summary, "links": links,
+                    "fingerprint": fingerprint, "timings": clock.timings}
+        if find_duplicate is not None:
+            analysis["duplicate_of"] = None
+        return analysis
+
+    def find_matches(self, text):
+        # Returns the number of hits per keyword, in the order the keywords were given
+        search_text = text if self.case_sensitive else text.lower()
+        return self.matcher.count(search_text)
+
+    def extract_date(self, text, html_content=None):
+        # Patterns and tables are compiled once at import, see dates.py
+        return extract_date(text, html_content)
+
+    def summarize_text(self, text, num_sentences=3):
+        if self.summary_max_chars:
+            text = text[:self.summary_max_chars]
+        sentences = self.tokenizer.tokenize_sentences(text)
+        word_freq = Counter(self.stem(word) for word in self.tokenizer.tokenize_words(text))
+
+        # Sentences are tokenized and stemmed once; repeated sentences accumulate their scores
+        sentence_scores = {}
+        for sentence in sentences:
+            scores = [word_freq[stem] for stem in map(self.stem, self.tokenizer.tokenize_words(sentence)) if stem in word_freq]
+            if scores:
+                sentence_scores[sentence] = sentence_scores.get(sentence, 0) + sum(scores)
+
+        summary_sentences = sorted(sentence_scores, key=sentence_scores.get, reverse=True)[:num_sentences]
+        summary = ' '.join(summary_sentences)
+        return summary
+
+
 class WebCrawler:
-    def __init__(self, start_url, search_words, max_depth=3, case_sensitive=False, exact_match=False, exclude_urls=None, progress_dict=None, crawl_id=None, matched_items=None):
+    def __init__(self, start_url, search_words, max_depth=3, case_sensitive=False, exact_match=False, exclude_urls=None, progress_dict=None, crawl_id=None, matched_items=None,
+                 process_workers=0, executor=None, parser_backend='auto', state_path=None, checkpoint_interval=30,
+                 summary_max_chars=None,
+                 strip_query_params=None, workers=10, host_scheduler=None, max_retries=2,
+                 cache_path=None, cache_max_bytes=256 * 1024 * 1024, session=None, near_duplicate_distance=3,
+                 max_page_bytes=10 * 1024 * 1024, use_robots=False, use_sitemaps=False, max_sitemap_urls=10000,
+                 history_path=None):
         self.start_url = start_url
         self.search_words = search_words if case_sensitive else [w.lower() for w in search_words]
         self.max_depth = max_depth
         self.case_sensitive = case_sensitive
         self.exact_match = exact_match
         self.exclude_urls = exclude_urls or []
+        self.parser_backend = parser_backend
+        self.summary_max_chars = summary_max_chars
+        # parser_backend picks the HTML extraction backend ('auto', 'selectolax', 'lxml' or 'bs4')
+        # Pages whose text is within near_duplicate_distance bits (SimHash) of an earlier
+        # page are not matched or summarized but listed as aliases of it; None disables this
+        self.near_duplicate_distance = near_duplicate_distance
+        self.duplicates = NearDuplicateIndex(near_duplicate_distance) if near_duplicate_distance is not None else None
+        self.duplicate_pages = 0
+        # URLs with a result in this crawl; duplicates of them are reported as aliases
+        self.reported = set()
+        fingerprints = self.duplicates is not None
+        self.analyzer = PageAnalyzer(search_words, case_sensitive, exact_match, parser_backend, summary_max_chars, fingerprints)
+        # Picklable description of the analyzer used to rebuild it in worker processes
+        self.analyzer_config = (tuple(search_words), case_sensitive, exact_match, parser_backend, summary_max_chars, fingerprints)
         self.to_visit = asyncio.Queue()
         self.visited = set()
+        # Canonical form of every URL ever queued, so each page is queued only once
+        self.seen = set()
+        self.canonicalizer = UrlCanonicalizer(strip_query_params)
+        # A session passed in is shared with other crawls (connection pool, DNS cache)
+        # and left open; otherwise the crawl opens and closes its own
+        self.shared_session = session
         self.session = None
         self.total_pages = 0
         self.total_matches = 0
@@ -31,20 +160,47 @@ class WebCrawler:
         self.word_frequency = Counter()
         self.start_time = time.time()
         self.all_links = set()
-        self.date_patterns = [
-            r'(\d{4}/\d{2}/\d{2})',
-            r'((?:یکشنبه|دوشنبه|سه‌شنبه|چهارشنبه|پنجشنبه|جمعه|شنبه)\s+\d{1,2}\s+(?:فروردین|اردیبهشت|خرداد|تیر|مرداد|شهریور|مهر|آبان|آذر|دی|بهمن|اسفند)\s+\d{4})'
-        ]
-        self.persian_digits = {'۰': '0', '۱': '1', '۲': '2', '۳': '3', '۴': '4', '۵': '5', '۶': '6', '۷': '7', '۸': '8', '۹': '9'}
-        self.persian_months = {
-            'فروردین': 1, 'اردیبهشت': 2, 'خرداد': 3, 'تیر': 4, 'مرداد': 5, 'شهریور': 6,
-            'مهر': 7, 'آبان': 8, 'آذر': 9, 'دی': 10, 'بهمن': 11, 'اسفند': 12
-        }
-        self.normalizer = Normalizer()
-        self.tokenizer = Tokenizer()
-        self.stemmer = FindStems()
+        # Hosts of all discovered links, maintained as the crawl goes for the domains export
+        self.domains = set()
         self.stop_crawling = False
 
+        # Number of concurrent workers; the scheduler decides how many of them may
+        # hit the same host at once and how fast
+        self.workers = workers
+        self.scheduler = host_scheduler or HostScheduler(max_concurrency=workers)
+        self.max_retries = max_retries  # Retries after a 429/503 response
+        self.throttled_responses = 0
+
+        # Bodies are read in chunks up to max_page_bytes; longer pages are truncated, and
+        # pages that announce a larger Content-Length or aren't HTML are not read at all
+        self.max_page_bytes = max_page_bytes
+        self.truncated_pages = 0
+        self.skipped_pages = 0
+
+        # Stage timings, bytes, status codes and queue depth, see metrics.CrawlMetrics
+        self.metrics = CrawlMetrics()
+
+        # use_robots applies the site's robots.txt rules and Crawl-delay; use_sitemaps
+        # queues up to max_sitemap_urls pages from its sitemaps at the start, newest first
+        self.use_robots = use_robots
+        self.use_sitemaps = use_sitemaps
+        self.max_sitemap_urls = max_sitemap_urls
+        self.robots = None
+        self.robots_blocked = 0
+        self.sitemap_pages = 0
+
+        # Optional response cache shared across crawls; pages that come back 304 Not
+        # Modified reuse their cached body and extraction results
+        self.cache = ResponseCache(cache_path, cache_max_bytes) if cache_path else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Optional process pool for the parse/normalize/match/summarize stage. An executor
+        # passed in is shared with other crawls and left running; process_workers > 0
+        # makes the crawl start (and shut down) a pool of its own.
+        self.executor = executor
+        self.process_workers = process_workers
+
         # List of file extensions to ignore
         self.ignored_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.ico',
                                    '.mp4', '.mp3', '.avi', '.mov', '.wmv', '.flv', '.webm',
@@ -56,74 +212,325 @@ class WebCrawler:
         self.progress = progress_dict if progress_dict is not None else {}
         self.crawl_id = crawl_id if crawl_id is not None else str(uuid.uuid4())
 
-        # Shared list to store matched items
-        self.matched_items = matched_items if matched_items is not None else []
+        # Optional shared list (or sink) every new result is also appended to
+        self.matched_items = matched_items
 
         # Event to control pausing and resuming
         self.pause_event = asyncio.Event()
         self.pause_event.set()  # Start in running state
+        self.stop_event = asyncio.Event()
+        self.loop = None
+
+        # Optional "since last run" mode: pages whose content hash is unchanged since the
+        # last finished run with the same start URL and search configuration reuse its
+        # analysis, and results only hold new, changed and removed matches
+        self.history_path = history_path
+        self.history = None
+        if history_path:
+            key = history_key(self.canonicalizer.canonicalize(start_url), self.analyzer_config)
+            self.history = CrawlHistory(history_path, key, self.crawl_id)
+        self.changes = Counter()
+        self.reused_pages = 0
+
+        # Optional on-disk crawl state. The frontier and URL sets then live in SQLite so
+        # memory stays bounded, and an interrupted crawl resumes from its last checkpoint.
+        self.state = None
+        self.resumed = False
+        # With state, self.results only holds results not yet checkpointed; the others are
+        # read back from the store. The lock keeps the two consistent for other threads.
+        self.saved_results = 0
+        self.results_lock = threading.Lock()
+        self.checkpoint_interval = checkpoint_interval
+        if state_path:
+            self.state = CrawlStateStore(state_path, self.crawl_id)
+            saved = self.state.load_crawl()
+            if saved is not None:
+                self.restore_checkpoint(saved)
+            self.to_visit = PersistentQueue(self.state)
+            self.visited = PersistentSet(self.state, 'visited')
+            self.seen = PersistentSet(self.state, 'seen')
+            self.all_links = PersistentSet(self.state, 'links')
+            self.reported = PersistentSet(self.state, 'reported')
+            self.state.on_flush = self.checkpoint
+
+    @classmethod
+    def from_checkpoint(cls, state_path, crawl_id, **kwargs):
+        # Rebuilds a crawler with the configuration it was checkpointed with, which wins
+        # over the options the caller passes for new crawls
+        saved = load_checkpoint(state_path, crawl_id)
+        if saved is None:
+            raise KeyError(f"No checkpoint found for crawl {crawl_id}")
+        return cls(crawl_id=crawl_id, state_path=state_path, **{**kwargs, **saved['config']})
+
+    def restore_checkpoint(self, saved):
+        stats = saved['stats']
+        self.total_pages = stats['total_pages']
+        self.total_matches = stats['total_matches']
+        self.word_frequency = Counter(stats['word_frequency'])
+        self.start_time = time.time() - stats['duration']
+        self.domains = set(stats.get('domains', []))
+        self.saved_results = self.state.count_results()
+        self.duplicate_pages = stats.get('duplicate_pages', 0)
+        self.truncated_pages = stats.get('truncated_pages', 0)
+        self.skipped_pages = stats.get('skipped_pages', 0)
+        self.robots_blocked = stats.get('robots_blocked', 0)
+        self.sitemap_pages = stats.get('sitemap_pages', 0)
+        self.changes = Counter(stats.get('changes', {}))
+        self.reused_pages = stats.get('reused_pages', 0)
+        # Pages that were in flight are crawled again, so they are not counted twice
+        self.total_pages -= self.state.restore_interrupted()
+        self.resumed = True
+        logger.info(f"Resuming crawl {self.crawl_id} from checkpoint ({self.total_pages} pages crawled).")
+
+    def checkpoint(self, status='running'):
+        config = {
+            'start_url': self.start_url,
+            'search_words': self.search_words,
+            'max_depth': self.max_depth,
+            'case_sensitive': self.case_sensitive,
+            'exact_match': self.exact_match,
+            'exclude_urls': self.exclude_urls,
+            'parser_backend': self.parser_backend,
+            'summary_max_chars': self.summary_max_chars,
+            'near_duplicate_distance': self.near_duplicate_distance,
+            'strip_query_params': self.canonicalizer.strip_params,
+            'use_robots': self.use_robots,
+            'use_sitemaps': self.use_sitemaps,
+            'max_sitemap_urls': self.max_sitemap_urls,
+            'history_path': self.history_path,
+            'workers': self.workers,
+            'max_retries': self.max_retries,
+            'max_page_bytes': self.max_page_bytes
+        }
+        stats = {
+            'total_pages': self.total_pages,
+            'total_matches': self.total_matches,
+            'word_frequency': dict(self.word_frequency),
+            'duration': time.time() - self.start_time,
+            'duplicate_pages': self.duplicate_pages,
+            'truncated_pages': self.truncated_pages,
+            'skipped_pages': self.skipped_pages,
+            'robots_blocked': self.robots_blocked,
+            'sitemap_pages': self.sitemap_pages,
+            'changes': dict(self.changes),
+            'reused_pages': self.reused_pages,
+            'domains': sorted(self.domains)
+        }
+        new_results = list(self.results)
+        with self.results_lock:
+            self.state.checkpoint(config, stats, new_results, status)
+            del self.results[:len(new_results)]
+            self.saved_results += len(new_results)
+
+    def results_since(self, start, limit=500):
+        # Up to limit results from position start on; safe to call from other threads
+        # while the crawl runs
+        if self.state is None:
+            return self.results[start:start + limit]
+        with self.results_lock:
+            saved = self.saved_results
+            skip = max(start - saved, 0)
+            unsaved = self.results[skip:skip + limit]
+        results = self.state.read_results(start, min(limit, saved - start)) if start < saved else []
+        return results + unsaved[:limit - len(results)]
+
+    def iter_results(self, batch=500):
+        position = 0
+        while True:
+            results = self.results_since(position, batch)
+            if not results:
+                return
+            yield from results
+            position += len(results)
+
+    async def checkpoint_periodically(self):
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            self.checkpoint()
+
+    def call_in_loop(self, callback):
+        # pause/resume/stop are usually called from a Flask request thread, and asyncio
+        # events may only be touched from the thread running the crawl's loop
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(callback)
+                return
+        callback()
 
     def pause(self):
-        self.pause_event.clear()
+        self.call_in_loop(self.pause_event.clear)
         logger.info("Crawler paused.")
 
     def resume(self):
-        self.pause_event.set()
+        self.call_in_loop(self.pause_event.set)
         logger.info("Crawler resumed.")
 
     def stop(self):
         self.stop_crawling = True
-        self.pause_event.set()  # Ensure any waiting workers can exit
+        self.call_in_loop(self.pause_event.set)  # Ensure any waiting workers can exit
+        self.call_in_loop(self.stop_event.set)
         logger.info("Crawler stopped.")
 
     async def crawl(self):
         workers = []
+        checkpointer = None
+        drained = False
+        self.loop = asyncio.get_running_loop()
+        owns_executor = self.executor is None and self.process_workers > 0
+        if owns_executor:
+            self.executor = ProcessPoolExecutor(max_workers=self.process_workers)
         try:
-            conn = aiohttp.TCPConnector(limit_per_host=10)
-            timeout = aiohttp.ClientTimeout(total=30)
-            async with aiohttp.ClientSession(connector=conn, timeout=timeout) as self.session:
-                await self.to_visit.put((self.start_url, 0))
+            async with self.open_session() as self.session:
+                await self.seed()
+                if self.state is not None:
+                    checkpointer = asyncio.create_task(self.checkpoint_periodically())
                 self.update_progress()  # Initialize progress
-                workers = [asyncio.create_task(self.worker()) for _ in range(10)]  # Adjust the number of workers as needed
-                while not self.stop_crawling and (not self.to_visit.empty() or any(not w.done() for w in workers)):
-                    await asyncio.sleep(0.1)
+                workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+
+                # Every queued URL is marked done only after its links have been queued, so
+                # join() returns exactly when the frontier has drained
+                frontier_drained = asyncio.create_task(self.to_visit.join())
+                stop_requested = asyncio.create_task(self.stop_event.wait())
+                if self.stop_crawling:
+                    self.stop_event.set()
+                await asyncio.wait({frontier_drained, stop_requested}, return_when=asyncio.FIRST_COMPLETED)
+                frontier_drained.cancel()
+                stop_requested.cancel()
+
+                if self.stop_crawling:
+                    # Abandon in-flight pages while the session is still open; a persistent
+                    # frontier keeps them for a later resume
+                    for w in workers:
+                        w.cancel()
+                else:
+                    drained = True
+                    # One sentinel per worker lets them exit on their own
+                    for _ in workers:
+                        self.to_visit.put_nowait(None)
+                await asyncio.gather(*workers, return_exceptions=True)
         except Exception as e:
             logger.error(f"Error in crawl method: {str(e)}")
         finally:
             for w in workers:
                 w.cancel()
-            duration = time.time() - self.start_time
-
-            # Ensure 'duration' is always set
-            analytics = {
-                "total_pages": self.total_pages,
-                "total_matches": self.total_matches,
-                "word_frequency": self.word_frequency.most_common(20),
-                "duration": duration,
-                "total_links": len(self.all_links)
-            }
-            return self.results, analytics, list(self.all_links)
+            await asyncio.gather(*workers, return_exceptions=True)
+            if checkpointer is not None:
+                checkpointer.cancel()
+            if self.history is not None:
+                if drained:
+                    self.add_removed()
+                    self.history.finish()
+                self.history.close()
+            if self.state is not None:
+                # A stopped crawl keeps its frontier and URL sets so it can be resumed
+                self.checkpoint('completed' if drained else 'stopped')
+            # Read before a finished crawl's URL sets are cleared from the state store
+            links = list(self.all_links)
+            if self.state is not None:
+                if drained:
+                    self.state.clear_urls()
+                self.state.close()
+            if owns_executor:
+                # Join the worker processes off the event loop
+                executor, self.executor = self.executor, None
+                await asyncio.get_running_loop().run_in_executor(None, functools.partial(executor.shutdown, cancel_futures=True))
+            if self.cache is not None:
+                self.cache.close()
+            # A crawl with state returns its results as an iterator over the store
+            results = self.iter_results() if self.state is not None else self.results
+            return results, self.analytics(), links
+
+    async def seed(self):
+        if self.use_robots or self.use_sitemaps:
+            robots = await fetch_robots(self.session, self.start_url)
+            if self.use_robots:
+                self.robots = robots
+                delay = robots.crawl_delay()
+                if delay:
+                    self.scheduler.set_delay(urlparse(self.start_url).netloc, delay)
+        if self.resumed:
+            return  # The restored frontier already holds the seeds
+        await self.enqueue(self.start_url, 0)
+        if self.use_sitemaps and self.max_depth > 0:
+            sitemap_urls = robots.sitemaps() or [urljoin(self.start_url, '/sitemap.xml')]
+            for url in await discover_urls(self.session, self.start_url, sitemap_urls, self.max_sitemap_urls):
+                # Sitemap pages count as one hop from the start page
+                if await self.enqueue(url, 1):
+                    self.sitemap_pages += 1
+
+    def add_removed(self):
+        # Matches of the last run that are gone now, reported with their old details
+        for url, analysis in self.history.removed():
+            match_counts = analysis['match_counts']
+            result = {"url": url, "matches": list(match_counts), "match_counts": match_counts,
+                      "date": analysis['date'], "summary": analysis['summary'], "change": 'removed'}
+            self.add_result(result)
+            self.changes['removed'] += 1
+
+    def add_result(self, result):
+        self.results.append(result)
+        if self.matched_items is not None:
+            self.matched_items.append(result)  # Add to shared matched items list
+
+    def open_session(self):
+        if self.shared_session is not None:
+            return contextlib.nullcontext(self.shared_session)
+        conn = aiohttp.TCPConnector(limit_per_host=self.scheduler.max_concurrency)
+        timeout = aiohttp.ClientTimeout(total=30)
+        return aiohttp.ClientSession(connector=conn, timeout=timeout, trace_configs=[trace_config()])
+
+    def analytics(self):
+        cache_lookups = self.cache_hits + self.cache_misses
+        return {
+            "total_pages": self.total_pages,
+            "total_matches": self.total_matches,
+            "word_frequency": self.word_frequency.most_common(20),
+            "duration": time.time() - self.start_time,
+            "total_links": len(self.all_links),
+            "throttled_responses": self.throttled_responses,
+            "duplicate_pages": self.duplicate_pages,
+            "truncated_pages": self.truncated_pages,
+            "skipped_pages": self.skipped_pages,
+            "robots_blocked": self.robots_blocked,
+            "sitemap_pages": self.sitemap_pages,
+            **({"changes": dict(self.changes), "reused_pages": self.reused_pages} if self.history is not None else {}),
+            "metrics": self.metrics.snapshot(),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_ratio": self.cache_hits / cache_lookups if cache_lookups else 0
+        }
 
     async def worker(self):
         try:
             while not self.stop_crawling:
                 await self.pause_event.wait()  # Wait if paused
-                if self.stop_crawling:
-                    break
-                if self.to_visit.empty():
-                    await asyncio.sleep(0.1)
-                    continue
                 item = await self.to_visit.get()
-                if item is None:
+                try:
+                    if item is None:
+                        break  # Sentinel: the frontier has drained
+                    # Paused while waiting for the item: hold on to it until resumed
+                    await self.pause_event.wait()
+                    if self.stop_crawling:
+                        break  # Stopped while waiting; the item stays in the frontier for a resume
+                    url, depth = item[:2]
+                    await self.process_url(url, depth)
+                    if self.state is not None:
+                        self.state.frontier_done(item[2])  # Persistent frontier items carry their row id
+                        # Batched writes are committed between pages, never halfway through one,
+                        # so the checkpoint holds the results of every page marked done
+                        if self.state.needs_flush():
+                            self.checkpoint()
+                except Exception as e:
+                    logger.error(f"Error in worker: {str(e)}")
+                finally:
                     self.to_visit.task_done()
-                    break
-                url, depth = item
-                await self.process_url(url, depth)
-                self.to_visit.task_done()
         except asyncio.CancelledError:
             pass  # Handle cancellation
-        except Exception as e:
-            logger.error(f"Error in worker: {str(e)}")
 
     async def process_url(self, url, depth):
         if self.stop_crawling:
@@ -141,111 +548,188 @@ class WebCrawler:
         self.total_pages += 1
         self.update_progress()
 
+        started = time.perf_counter()
         try:
-            async with self.session.get(url) as response:
-                content_type = response.headers.get('Content-Type', '').lower()
-                if not content_type.startswith('text/html'):
-                    logger.info(f"Skipping non-HTML content: {url} (Content-Type: {content_type})")
-                    return
-
-                html_content = await response.text()
-                soup = BeautifulSoup(html_content, 'html.parser')
-
-                for script in soup(["script", "style"]):
-                    script.decompose()
-                text = soup.get_text()
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                text = '\n'.join(chunk for chunk in chunks if chunk)
-
-                normalized_text = self.normalizer.normalize(text)
-                matches = self.find_matches(normalized_text)
-
-                if matches:
-                    self.total_matches += len(matches)
-                    date = self.extract_date(text)
-                    summary = self.summarize_text(normalized_text)
-                    result = {"url": url, "matches": matches, "date": date, "summary": summary}
-                    self.results.append(result)
-                    self.matched_items.append(result)  # Add to shared matched items list
-                    for match in matches:
-                        self.word_frequency[match] += 1
-
-                if depth < self.max_depth:
-                    links = soup.find_all('a', href=True)
-                    for link in links:
-                        new_url = urljoin(url, link['href'])
-                        new_parsed_url = urlparse(new_url)
-                        if any(new_parsed_url.path.lower().endswith(ext) for ext in self.ignored_extensions):
-                            continue  # Skip binary files
-                        if new_parsed_url.netloc == urlparse(self.start_url).netloc:
-                            if new_url not in self.visited and not any(exclude in new_url for exclude in self.exclude_urls):
-                                await self.to_visit.put((new_url, depth + 1))
-                self.update_progress()
+            page = await self.fetch(url)
+            if page is None:
+                return
+            extract_links = depth < self.max_depth
+            analysis_key = self.analysis_key(extract_links)
+            cached = page['cached']
+            previous = None
+            if self.history is not None:
+                page_hash = content_hash(page['body'])
+                previous = self.history.previous(page['cache_key'])
+            if cached is not None and cached['analysis_key'] == analysis_key:
+                analysis = cached['analysis']
+                duplicate_of = self.find_duplicate(url, analysis.get('fingerprint'))
+            elif (previous is not None and previous['content_hash'] == page_hash
+                  and (previous['links_extracted'] or not extract_links) and 'alias_of' not in previous['analysis']):
+                # Same content as in the last run
+                analysis = previous['analysis']
+                self.reused_pages += 1
+                duplicate_of = self.find_duplicate(url, analysis.get('fingerprint'))
+            else:
+                analysis = await self.analyze(page['body'], url, extract_links)
+                self.metrics.observe_all(analysis.pop('timings'))
+                if 'duplicate_of' in analysis:
+                    duplicate_of = analysis.pop('duplicate_of')  # Already checked while analyzing
+                else:
+                    duplicate_of = self.find_duplicate(url, analysis['fingerprint'])
+                if self.cache is not None and duplicate_of is None:
+                    self.cache.put(page['cache_key'], page['body'], page['etag'], page['last_modified'], analysis_key, analysis)
+            match_counts = analysis['match_counts']
+
+            change = None
+            if self.history is not None and duplicate_of is not None:
+                self.history.record_alias(page['cache_key'], url, page_hash, self.canonicalizer.canonicalize(duplicate_of))
+            elif self.history is not None:
+                self.history.record(page['cache_key'], url, page_hash, analysis, extract_links)
+                if match_counts:
+                    previous_counts = previous['analysis']['match_counts'] if previous else None
+                    change = 'new' if not previous_counts else 'unchanged' if previous_counts == match_counts else 'changed'
+                    self.changes[change] += 1
+
+            if duplicate_of is not None:
+                self.duplicate_pages += 1
+                if duplicate_of in self.reported:
+                    # A record of its own, since the original's may already be checkpointed,
+                    # streamed or exported
+                    result = {"url": url, "matches": [], "match_counts": {}, "date": None, "summary": "", "alias_of": duplicate_of}
+                    self.add_result(result)
+            elif match_counts:
+                matches = list(match_counts)
+                self.total_matches += len(matches)
+                self.word_frequency.update(match_counts)
+                if change != 'unchanged':
+                    result = {"url": url, "matches": matches, "match_counts": match_counts, "date": analysis['date'], "summary": analysis['summary']}
+                    if change is not None:
+                        result["change"] = change
+                    self.add_result(result)
+                    self.reported.add(url)
+
+            start_netloc = urlparse(self.start_url).netloc
+            for new_url in analysis['links']:
+                self.all_links.add(new_url)
+                new_parsed_url = urlparse(new_url)
+                if new_parsed_url.netloc:
+                    self.domains.add(new_parsed_url.netloc)
+                if any(new_parsed_url.path.lower().endswith(ext) for ext in self.ignored_extensions):
+                    continue  # Skip binary files
+                if new_parsed_url.netloc == start_netloc:
+                    if not any(exclude in new_url for exclude in self.exclude_urls):
+                        await self.enqueue(new_url, depth + 1)
+            self.update_progress()
         except Exception as e:
+            self.metrics.count('errors')
             logger.error(f"Error crawling {url}: {str(e)}")
+        finally:
+            self.metrics.observe('page', time.perf_counter() - started)
 
-    def find_matches(self, text):
-        matches = []
-        search_text = text if self.case_sensitive else text.lower()
-        for word in self.search_words:
-            word_to_search = word if self.case_sensitive else word.lower()
-            if self.exact_match:
-                if word_to_search in search_text:
-                    matches.append(word)
-            else:
-                if re.search(r'\b' + re.escape(word_to_search) + r'\b', search_text):
-                    matches.append(word)
-        return matches
-
-    def extract_date(self, text):
-        for pattern in self.date_patterns:
-            match = re.search(pattern, text)
-            if match:
-                persian_date = match.group(1)
-                return self.convert_persian_date(persian_date)
+    async def fetch(self, url):
+        # Returns the page body with its validators, or None for pages that are skipped.
+        # 'cached' holds the cache entry when the server answered 304 Not Modified.
+        host = urlparse(url).netloc
+        cache_key = self.canonicalizer.canonicalize(url)
+        cached = self.cache.get(cache_key) if self.cache is not None else None
+        headers = {}
+        if cached is not None:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        for attempt in range(self.max_retries + 1):
+            waited = time.perf_counter()
+            async with self.scheduler.slot(host) as slot:
+                requested = time.perf_counter()
+                self.metrics.observe('schedule', requested - waited)
+                async with self.session.get(url, headers=headers, trace_request_ctx=self.metrics) as response:
+                    self.metrics.observe('response', time.perf_counter() - requested)
+                    self.metrics.status(response.status)
+                    slot.record(response.status, response.headers.get('Retry-After'))
+                    if response.status in THROTTLE_STATUSES:
+                        self.throttled_responses += 1
+                    if response.status in THROTTLE_STATUSES and attempt < self.max_retries:
+                        # The scheduler holds the next attempt back until the host recovers
+                        logger.info(f"Throttled by {host} (status {response.status}), retrying {url}")
+                        continue
+                    if response.status == 304 and cached is not None:
+                        self.cache_hits += 1
+                        return {'body': cached['body'], 'etag': cached['etag'], 'last_modified': cached['last_modified'],
+                                'cached': cached, 'cache_key': cache_key}
+                    content_type = response.headers.get('Content-Type', '').lower()
+                    if not content_type.startswith('text/html'):
+                        logger.info(f"Skipping non-HTML content: {url} (Content-Type: {content_type})")
+                        self.skipped_pages += 1
+                        return None
+                    if response.content_length is not None and response.content_length > self.max_page_bytes:
+                        logger.info(f"Skipping oversized page: {url} ({response.content_length} bytes)")
+                        self.skipped_pages += 1
+                        return None
+                    if self.cache is not None:
+                        self.cache_misses += 1
+                    body = await self.read_body(url, response)
+                    return {'body': decode_html(body, response.charset), 'etag': response.headers.get('ETag'),
+                            'last_modified': response.headers.get('Last-Modified'), 'cached': None, 'cache_key': cache_key}
         return None
 
-    def convert_persian_date(self, persian_date):
-        try:
-            for persian_digit, english_digit in self.persian_digits.items():
-                persian_date = persian_date.replace(persian_digit, english_digit)
+    async def read_body(self, url, response):
+        started = time.perf_counter()
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > self.max_page_bytes:
+                logger.info(f"Truncating page over {self.max_page_bytes} bytes: {url}")
+                self.truncated_pages += 1
+                response.close()  # Drop the connection instead of draining the rest
+                break
+        self.metrics.observe('download', time.perf_counter() - started)
+        self.metrics.count('bytes_fetched', size)
+        return b''.join(chunks)[:self.max_page_bytes]
 
-            if '/' in persian_date:
-                jdate = jdatetime.datetime.strptime(persian_date, '%Y/%m/%d')
-            else:
-                parts = persian_date.split()
-                day = int(parts[-3])
-                month = self.persian_months[parts[-2]]
-                year = int(parts[-1])
-                jdate = jdatetime.datetime(year, month, day)
-
-            gdate = jdate.togregorian()
-            return gdate.strftime('%Y-%m-%d')
-        except Exception as e:
-            logger.error(f"Error converting Persian date: {e}")
-            return persian_date
+    def analysis_key(self, extract_links):
+        # Cached extraction results are only valid for the same search configuration
+        return hashlib.sha1(repr((self.analyzer_config, extract_links)).encode('utf-8')).hexdigest()
 
-    def summarize_text(self, text, num_sentences=3):
-        sentences = self.tokenizer.tokenize_sentences(text)
-        words = self.tokenizer.tokenize_words(text)
-        stemmed_words = [self.stemmer.convert_to_stem(word) for word in words]
-        word_freq = Counter(stemmed_words)
+    async def enqueue(self, url, depth):
+        # Deduplicate when queueing rather than when dequeuing, so the queue never
+        # holds the same page twice
+        key = self.canonicalizer.canonicalize(url)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        if self.robots is not None and not self.robots.can_fetch(url):
+            self.robots_blocked += 1
+            return False
+        await self.to_visit.put((url, depth))
+        return True
 
-        sentence_scores = {}
-        for sentence in sentences:
-            sentence_words = self.tokenizer.tokenize_words(sentence)
-            for word in sentence_words:
-                stemmed_word = self.stemmer.convert_to_stem(word)
-                if stemmed_word in word_freq:
-                    if sentence not in sentence_scores:
-                        sentence_scores[sentence] = word_freq[stemmed_word]
-                    else:
-                        sentence_scores[sentence] += word_freq[stemmed_word]
+    def find_duplicate(self, url, fingerprint):
+        if self.duplicates is None:
+            return None
+        return self.duplicates.find_or_add(url, fingerprint)
 
-        summary_sentences = sorted(sentence_scores, key=sentence_scores.get, reverse=True)[:num_sentences]
-        summary = ' '.join(summary_sentences)
-        return summary
+    async def analyze(self, html_content, url, extract_links):
+        if self.executor is None:
+            find_duplicate = self.find_duplicate if self.duplicates is not None else None
+            return self.analyzer.analyze(html_content, url, extract_links, find_duplicate)
+        # Keep the event loop free for fetching while the page is analyzed elsewhere. The
+        # duplicate index lives here, so worker processes analyze every page in full and
+        # duplicates are only dropped from the results afterwards.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, analyze_page, self.analyzer_config, html_content, url, extract_links)
+
+    def find_matches(self, text):
+        return self.analyzer.find_matches(text)
+
+    def extract_date(self, text, html_content=None):
+        return self.analyzer.extract_date(text, html_content)
+
+    def summarize_text(self, text, num_sentences=3):
+        return self.analyzer.summarize_text(text, num_sentences)
 
     def update_progress(self):
         self.progress[self.crawl_id] = {
@@ -253,3 +737,19 @@ class WebCrawler:
             'pages_to_visit': self.to_visit.qsize(),
             'total_matches': self.total_matches
         }
+        self.metrics.sample_queue(self.to_visit.qsize())
+
+
+# Analyzers cached per worker process, keyed by their configuration
+_process_analyzers = {}
+MAX_PROCESS_ANALYZERS = 8
+
+
+def analyze_page(analyzer_config, html_content, url, extract_links=True):
+    # Entry point for worker processes
+    analyzer = _process_analyzers.get(analyzer_config)
+    if analyzer is None:
+        if len(_process_analyzers) >= MAX_PROCESS_ANALYZERS:
+            _process_analyzers.pop(next(iter(_process_analyzers)))
+        analyzer = _process_analyzers[analyzer_config] = PageAnalyzer(*analyzer_config)
+    return analyzer.analyze(html_content, url, extract_links)
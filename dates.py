@@ -0,0 +1,131 @@
+# dates.py
+
+import datetime
+import re
+
+import jdatetime
+
+# Persian (U+06F0-U+06F9) and Arabic-Indic (U+0660-U+0669) digits to ASCII
+DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+
+PERSIAN_MONTHS = {
+    'فروردین': 1, 'اردیبهشت': 2, 'خرداد': 3, 'تیر': 4, 'مرداد': 5, 'شهریور': 6,
+    'مهر': 7, 'آبان': 8, 'آذر': 9, 'دی': 10, 'بهمن': 11, 'اسفند': 12
+}
+GREGORIAN_MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6, 'july': 7,
+    'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8, 'sep': 9, 'sept': 9,
+    'oct': 10, 'nov': 11, 'dec': 12,
+    # As written on Persian sites
+    'ژانویه': 1, 'فوریه': 2, 'مارس': 3, 'آوریل': 4, 'مه': 5, 'می': 5, 'ژوئن': 6, 'ژوئیه': 7,
+    'اوت': 8, 'آگوست': 8, 'سپتامبر': 9, 'اکتبر': 10, 'نوامبر': 11, 'دسامبر': 12
+}
+# Arabic yeh and kaf, which many Persian pages use in place of the Persian letters
+ARABIC_LETTERS = str.maketrans('يك', 'یک')
+
+# Numeric years below this are Solar Hijri, e.g. 1402/07/12; larger ones are Gregorian
+JALALI_YEAR_LIMIT = 1700
+# Years outside these ranges are taken for phone numbers, codes and the like
+JALALI_YEARS = range(1300, 1501)
+GREGORIAN_YEARS = range(1900, 2101)
+
+# Publication date hints in the markup; meta tags are only looked for in the first part
+# of the document, where <head> is
+HEAD_CHARS = 65536
+DATE_META_NAMES = ('article:published_time', 'og:published_time', 'datepublished', 'pubdate',
+                   'publishdate', 'date', 'dc.date', 'dc.date.issued')
+META_TAG = re.compile(r'<meta\b[^>]*>', re.IGNORECASE)
+META_NAME = re.compile(r'\b(?:property|name|itemprop)\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+META_CONTENT = re.compile(r'\bcontent\s*=\s*["\']([^"\']*)', re.IGNORECASE)
+TIME_TAG = re.compile(r'<time\b[^>]*\bdatetime\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+JSON_LD_DATE = re.compile(r'"datePublished"\s*:\s*"([^"]+)"')
+
+
+# All supported formats in one pattern, so the text is scanned once. The last group of
+# each alternative names the format (match.lastgroup). Month names are matched as any
+# word and looked up afterwards, which keeps the scan fast. Digit runs must not be part
+# of longer numbers, so e.g. 123456/1/2 is not read as 3456/1/2.
+DATE_PATTERN = re.compile(
+    # 1402/07/12, 2024-01-15
+    r'(?<!\d)(?P<ny>\d{4})([/-])(?P<nm>\d{1,2})\2(?P<numeric>\d{1,2})(?!\d)'
+    # ۱۲ مهر ۱۴۰۲ (usually preceded by the weekday), 15 January 2024, ۱۵ ژانویه ۲۰۲۴
+    r'|(?<!\d)(?P<td>\d{1,2})\s+(?P<tm>[^\W\d_]{2,9})\.?,?\s+(?P<day_first>\d{4})(?!\d)'
+    # January 15, 2024
+    r'|\b(?P<em>[A-Za-z]{3,9})\.?\s+(?P<ed>\d{1,2}),?\s+(?P<month_first>\d{4})(?!\d)'
+)
+
+
+def number(value):
+    return int(value.translate(DIGITS))
+
+
+def to_gregorian(year, month, day, jalali=None):
+    # Returns YYYY-MM-DD, or None when the date doesn't exist or the year is implausible.
+    # jalali=None decides by the year, for numeric dates.
+    if jalali is None:
+        jalali = year < JALALI_YEAR_LIMIT
+    if year not in (JALALI_YEARS if jalali else GREGORIAN_YEARS):
+        return None
+    try:
+        if jalali:
+            date = jdatetime.date(year, month, day).togregorian()
+        else:
+            date = datetime.date(year, month, day)
+    except ValueError:
+        return None
+    return date.strftime('%Y-%m-%d')
+
+
+def convert_match(match):
+    kind = match.lastgroup
+    if kind == 'numeric':
+        return to_gregorian(number(match['ny']), number(match['nm']), number(match['numeric']))
+    if kind == 'day_first':
+        name = match['tm'].lower().translate(ARABIC_LETTERS)
+        day, year = number(match['td']), number(match['day_first'])
+    else:
+        name = match['em'].lower()
+        day, year = number(match['ed']), number(match['month_first'])
+    if name in PERSIAN_MONTHS:
+        return to_gregorian(year, PERSIAN_MONTHS[name], day, jalali=True)
+    if name in GREGORIAN_MONTHS:
+        return to_gregorian(year, GREGORIAN_MONTHS[name], day, jalali=False)
+    return None  # Not a month name
+
+
+def find_date(text):
+    # First valid date in the text; later candidates are only looked at if earlier ones
+    # turn out not to exist (e.g. month 13)
+    for match in DATE_PATTERN.finditer(text):
+        date = convert_match(match)
+        if date is not None:
+            return date
+    return None
+
+
+def markup_hints(html_content):
+    # Date values the page declares about itself, most reliable first
+    head = html_content[:HEAD_CHARS]
+    for tag in META_TAG.finditer(head):
+        name = META_NAME.search(tag.group())
+        if name and name.group(1).lower() in DATE_META_NAMES:
+            content = META_CONTENT.search(tag.group())
+            if content:
+                yield content.group(1)
+    for match in JSON_LD_DATE.finditer(head):
+        yield match.group(1)
+    for match in TIME_TAG.finditer(html_content):
+        yield match.group(1)
+
+
+def extract_date(text, html_content=None):
+    # Publication date as a Gregorian YYYY-MM-DD string. Markup hints (<meta>
+    # published time, JSON-LD, <time datetime>) are checked before the visible text,
+    # which is scanned from the top, where bylines usually are.
+    if html_content:
+        for value in markup_hints(html_content):
+            date = find_date(value)
+            if date is not None:
+                return date
+    return find_date(text)
@@ -0,0 +1,169 @@
+# discovery.py
+
+import heapq
+import logging
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+logger = logging.getLogger(__name__)
+
+# The sitemap protocol caps a sitemap at 50 MB uncompressed; this also bounds gzip bombs
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class RobotsRules:
+    # robots.txt of one host. A missing robots.txt allows everything; 401/403 forbids
+    # everything, like most crawlers do.
+    def __init__(self, url, user_agent='*'):
+        self.url = url
+        self.user_agent = user_agent
+        self.parser = RobotFileParser(url)
+
+    def load(self, status, text):
+        if status in (401, 403):
+            self.parser.disallow_all = True
+        elif status >= 400:
+            self.parser.allow_all = True
+        else:
+            self.parser.parse(text.splitlines())
+
+    def can_fetch(self, url):
+        return self.parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self):
+        delay = self.parser.crawl_delay(self.user_agent)
+        if delay is None:
+            rate = self.parser.request_rate(self.user_agent)
+            delay = rate.seconds / rate.requests if rate else None
+        return float(delay) if delay is not None else None
+
+    def sitemaps(self):
+        return self.parser.site_maps() or []
+
+
+async def fetch_robots(session, start_url, user_agent='*'):
+    url = urljoin(start_url, '/robots.txt')
+    rules = RobotsRules(url, user_agent)
+    try:
+        async with session.get(url) as response:
+            text = await response.text(errors='replace') if response.status < 400 else ''
+            rules.load(response.status, text)
+    except Exception as e:
+        logger.info(f"Could not fetch {url}, assuming everything is allowed: {e}")
+        rules.load(404, '')
+    return rules
+
+
+def parse_lastmod(value):
+    # W3C datetime, e.g. 2024-05-01 or 2024-05-01T10:00:00Z; returns a UTC timestamp
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+class SitemapParser:
+    # Incremental parser for sitemaps and sitemap indexes, gzipped or not. Feed it
+    # the raw body a chunk at a time; each call returns the entries completed so far
+    # as (kind, loc, lastmod) with kind 'url' or 'sitemap'.
+    def __init__(self, max_bytes=MAX_SITEMAP_BYTES):
+        self.parser = XMLPullParser(events=('start', 'end'))
+        self.decompressor = None
+        self.first_chunk = True
+        self.root = None
+        self.size = 0
+        self.max_bytes = max_bytes
+
+    def feed(self, chunk):
+        if self.first_chunk:
+            self.first_chunk = False
+            if chunk.startswith(GZIP_MAGIC):
+                self.decompressor = zlib.decompressobj(wbits=31)
+        if self.decompressor is not None:
+            chunk = self.decompressor.decompress(chunk, self.max_bytes - self.size + 1)
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise ValueError(f"Sitemap larger than {self.max_bytes} bytes")
+        self.parser.feed(chunk)
+        return self.entries()
+
+    def entries(self):
+        entries = []
+        for event, element in self.parser.read_events():
+            if event == 'start':
+                if self.root is None:
+                    self.root = element
+                continue
+            kind = local_name(element.tag)
+            if kind not in ('url', 'sitemap'):
+                continue
+            fields = {local_name(child.tag): (child.text or '').strip() for child in element}
+            if fields.get('loc'):
+                entries.append((kind, fields['loc'], parse_lastmod(fields.get('lastmod'))))
+            # Drop finished entries so memory stays flat on large sitemaps
+            self.root.clear()
+        return entries
+
+
+async def read_sitemap(session, url, max_bytes=MAX_SITEMAP_BYTES):
+    # Streams one sitemap and returns its (kind, loc, lastmod) entries
+    parser = SitemapParser(max_bytes)
+    entries = []
+    async with session.get(url) as response:
+        if response.status >= 400:
+            logger.info(f"Sitemap {url} returned status {response.status}")
+            return entries
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            entries.extend(parser.feed(chunk))
+    return entries
+
+
+async def discover_urls(session, start_url, sitemap_urls, max_urls=10000, max_sitemaps=50):
+    # Walks the sitemaps (following sitemap indexes) and returns up to max_urls page
+    # URLs on the start URL's host, most recently modified first; pages without a
+    # lastmod come last
+    host = urlparse(start_url).netloc
+    pending = list(sitemap_urls)
+    visited = set()
+    newest = []  # Min-heap of (lastmod, order, url) holding the max_urls freshest pages
+    order = 0
+    while pending and len(visited) < max_sitemaps:
+        url = pending.pop(0)
+        if url in visited:
+            continue
+        visited.add(url)
+        try:
+            entries = await read_sitemap(session, url)
+        except (ParseError, ValueError, zlib.error) as e:
+            logger.info(f"Skipping unreadable sitemap {url}: {e}")
+            continue
+        except Exception as e:
+            logger.info(f"Could not fetch sitemap {url}: {e}")
+            continue
+        for kind, loc, lastmod in entries:
+            loc = urljoin(url, loc)
+            if kind == 'sitemap':
+                pending.append(loc)
+            elif urlparse(loc).netloc == host:
+                # Earlier entries win ties, so order counts down
+                order -= 1
+                item = (lastmod if lastmod is not None else float('-inf'), order, loc)
+                if len(newest) < max_urls:
+                    heapq.heappush(newest, item)
+                elif item > newest[0]:
+                    heapq.heapreplace(newest, item)
+    logger.info(f"Read {len(visited)} sitemaps for {host}, {len(newest)} pages selected")
+    return [loc for _, _, loc in sorted(newest, reverse=True)]
@@ -0,0 +1,104 @@
+# exports.py
+
+import csv
+import json
+import zlib
+
+# Exports are produced piece by piece; lines are grouped into chunks of about this size
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'jsonl': ('jsonl', 'application/x-ndjson'),
+}
+
+# Matched items as CSV; JSONL exports write the result dicts themselves
+MATCH_HEADER = ['URL', 'Matches', 'Date', 'Summary', 'Duplicate of']
+
+
+class LineBuffer:
+    # File-like target for csv.writer that hands back each written line
+    def __init__(self):
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
+
+    def pop(self):
+        text = ''.join(self.lines)
+        self.lines = []
+        return text
+
+
+def iter_csv(header, rows):
+    buffer = LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.pop()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.pop()
+
+
+def iter_jsonl(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def rows_to_records(header, rows):
+    keys = [column.lower() for column in header]
+    return (dict(zip(keys, row)) for row in rows)
+
+
+def match_row(result, incremental=False):
+    # CSV row for a matched item; near-duplicates name the page they copy instead of
+    # repeating its details, and crawls that only report changes add the change
+    row = [
+        result['url'],
+        ', '.join(result['matches']),
+        '' if 'alias_of' in result else result['date'] or 'Not found',
+        result['summary'],
+        result.get('alias_of', '')
+    ]
+    if incremental:
+        row.append(result.get('change', ''))
+    return row
+
+
+def iter_chunks(lines, chunk_size=CHUNK_SIZE):
+    chunk = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        chunk.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def iter_gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(header, rows, file_format='csv', compress=False, records=None):
+    # Returns (iterator of bytes, file extension, mimetype) without materializing the export.
+    # JSONL writes records (dicts, keeping lists and nulls) when given, otherwise the rows
+    # keyed by the lowercased header. Only the one the format needs is consumed.
+    extension, mimetype = FORMATS[file_format]
+    if file_format == 'csv':
+        lines = iter_csv(header, rows)
+    else:
+        lines = iter_jsonl(records if records is not None else rows_to_records(header, rows))
+    chunks = iter_chunks(lines)
+    if compress:
+        return iter_gzip(chunks), extension + '.gz', 'application/gzip'
+    return chunks, extension, mimetype
@@ -0,0 +1,140 @@
+# extraction.py
+
+import codecs
+import logging
+import re
+from bs4 import BeautifulSoup
+
+# Faster parsers are optional; BeautifulSoup remains the fallback
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+SKIPPED_TAGS = ('script', 'style')
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">,
+# looked for only near the top of the document like browsers do
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+CHARSET_SNIFF_BYTES = 4096
+
+
+class BeautifulSoupExtractor:
+    name = 'bs4'
+
+    def extract(self, html_content, extract_links=True):
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        for script in soup(list(SKIPPED_TAGS)):
+            script.decompose()
+        text = soup.get_text()
+        hrefs = [link['href'] for link in soup.find_all('a', href=True)] if extract_links else []
+        return text, hrefs
+
+
+class LxmlExtractor:
+    name = 'lxml'
+
+    def extract(self, html_content, extract_links=True):
+        root = lxml.html.document_fromstring(html_content)
+        parts = []
+        hrefs = []
+        # Walk the tree once in document order, collecting text and links together
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+                continue
+            tag = node.tag
+            # Comments and processing instructions have a non-string tag
+            if not isinstance(tag, str) or tag in SKIPPED_TAGS:
+                continue
+            if extract_links and tag == 'a':
+                href = node.get('href')
+                if href is not None:
+                    hrefs.append(href)
+            if node.text:
+                parts.append(node.text)
+            for child in reversed(node):
+                if child.tail:
+                    stack.append(child.tail)
+                stack.append(child)
+        return ''.join(parts), hrefs
+
+
+class SelectolaxExtractor:
+    name = 'selectolax'
+
+    def extract(self, html_content, extract_links=True):
+        tree = LexborHTMLParser(html_content)
+        hrefs = []
+        if extract_links:
+            # Valueless attributes come back as None, BeautifulSoup reports them as ''
+            hrefs = [node.attributes['href'] or '' for node in tree.css('a[href]')]
+        tree.strip_tags(list(SKIPPED_TAGS))
+        text = tree.root.text(deep=True) if tree.root is not None else ''
+        return text, hrefs
+
+
+EXTRACTORS = {'bs4': BeautifulSoupExtractor}
+if lxml is not None:
+    EXTRACTORS['lxml'] = LxmlExtractor
+if LexborHTMLParser is not None:
+    EXTRACTORS['selectolax'] = SelectolaxExtractor
+
+# Preferred order when the backend is 'auto'
+AUTO_ORDER = ('selectolax', 'lxml', 'bs4')
+
+
+def get_extractor(backend='auto'):
+    if backend == 'auto':
+        backend = next(name for name in AUTO_ORDER if name in EXTRACTORS)
+    if backend not in EXTRACTORS:
+        logger.warning(f"Extraction backend '{backend}' is not available, falling back to BeautifulSoup.")
+        backend = 'bs4'
+    return EXTRACTORS[backend]()
+
+
+def decode_html(data, charset=None):
+    # Charset from the Content-Type header, else from a <meta> tag, else UTF-8;
+    # undecodable bytes are replaced rather than failing the page
+    if data.startswith(codecs.BOM_UTF8):
+        return data[len(codecs.BOM_UTF8):].decode('utf-8', errors='replace')
+    encoding = 'utf-8'
+    declared = META_CHARSET.search(data, 0, CHARSET_SNIFF_BYTES)
+    for candidate in (charset, declared.group(1).decode('ascii') if declared else None):
+        if not candidate:
+            continue
+        try:
+            encoding = codecs.lookup(candidate).name
+            break
+        except LookupError:
+            logger.debug(f"Unknown charset '{candidate}', ignoring it")
+    return data.decode(encoding, errors='replace')
+
+
+def clean_text(text):
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+def extract_page(extractor, html_content, extract_links=True):
+    # Returns the visible text of the page and the raw href of every link
+    try:
+        text, hrefs = extractor.extract(html_content, extract_links)
+    except Exception as e:
+        if isinstance(extractor, BeautifulSoupExtractor):
+            raise
+        # Documents the fast parsers reject (empty pages, encoding declarations, ...)
+        logger.debug(f"{extractor.name} failed to parse page, falling back to BeautifulSoup: {e}")
+        text, hrefs = BeautifulSoupExtractor().extract(html_content, extract_links)
+    return clean_text(text), hrefs
@@ -0,0 +1,80 @@
+# fingerprint.py
+
+import hashlib
+import re
+from collections import OrderedDict
+
+FINGERPRINT_BITS = 64
+WORD_PATTERN = re.compile(r'\w+')
+
+# BIT_TABLES[b] maps every byte value to its bit b, so bytes.translate() followed by
+# count(1) counts how many hashes have that bit set without a Python-level loop
+BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+
+def simhash(text, shingle_size=3, min_shingles=8):
+    # 64-bit SimHash over word shingles; pages whose fingerprints differ in only a few
+    # bits have nearly the same text. Returns None for pages too short to compare.
+    words = WORD_PATTERN.findall(text.lower())
+    shingles = {' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    if len(shingles) < min_shingles:
+        return None
+    hashes = [hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles]
+    half = len(hashes) / 2
+    fingerprint = 0
+    # Column i holds byte i of every hash; byte 0 carries the most significant bits
+    for position, column in enumerate(bytes(column) for column in zip(*hashes)):
+        shift = (7 - position) * 8
+        for bit, table in enumerate(BIT_TABLES):
+            if column.translate(table).count(1) > half:
+                fingerprint |= 1 << (shift + bit)
+    return fingerprint
+
+
+class NearDuplicateIndex:
+    # Finds an earlier page whose fingerprint is within max_distance bits. The 64 bits
+    # are split into max_distance + 1 bands; two fingerprints that close always agree
+    # on at least one whole band, so only pages sharing a band are compared. At most
+    # max_pages originals are kept; the oldest are forgotten first, since copies of a
+    # page tend to be found close to it.
+    def __init__(self, max_distance=3, max_pages=100000):
+        self.max_distance = max_distance
+        self.max_pages = max_pages
+        bands = max_distance + 1
+        width = FINGERPRINT_BITS // bands
+        self.bands = [(index * width, width if index < bands - 1 else FINGERPRINT_BITS - index * width)
+                      for index in range(bands)]
+        self.tables = [{} for _ in self.bands]
+        self.pages = OrderedDict()  # url -> fingerprint, oldest first
+
+    def band_keys(self, fingerprint):
+        return [(fingerprint >> shift) & ((1 << width) - 1) for shift, width in self.bands]
+
+    def find(self, fingerprint):
+        keys = self.band_keys(fingerprint)
+        for table, key in zip(self.tables, keys):
+            for other, url in table.get(key, ()):
+                if bin(fingerprint ^ other).count('1') <= self.max_distance:
+                    return url
+        return None
+
+    def find_or_add(self, url, fingerprint):
+        # Returns the URL of the page this one duplicates, or registers it as an original
+        if fingerprint is None:
+            return None
+        original = self.find(fingerprint)
+        if original is None:
+            for table, key in zip(self.tables, self.band_keys(fingerprint)):
+                table.setdefault(key, []).append((fingerprint, url))
+            self.pages[url] = fingerprint
+            if len(self.pages) > self.max_pages:
+                self.forget_oldest()
+        return original
+
+    def forget_oldest(self):
+        url, fingerprint = self.pages.popitem(last=False)
+        for table, key in zip(self.tables, self.band_keys(fingerprint)):
+            entries = table[key]
+            entries.remove((fingerprint, url))
+            if not entries:
+                del table[key]
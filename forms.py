@@ -7,6 +7,10 @@ class CrawlForm(FlaskForm):
     words = TextAreaField('Search Word(s)', validators=[DataRequired()], description='Separate multiple words with commas.', render_kw={"placeholder": "Enter words to search, separated by commas"})
     exclude_urls = TextAreaField('Exclude URLs', description='Optional. Separate multiple URLs with commas.', render_kw={"placeholder": "Enter URLs to exclude, separated by commas"})
     depth = IntegerField('Crawl Depth', validators=[DataRequired(), NumberRange(min=1, max=10)], default=3)
+    workers = IntegerField('Concurrent Requests', validators=[DataRequired(), NumberRange(min=1, max=50)], default=10, description='Upper limit; the crawler slows down by itself when the site struggles.')
     case_sensitive = BooleanField('Case Sensitive Search')
     exact_match = BooleanField('Exact Match Search')
+    use_robots = BooleanField('Respect robots.txt', default=True)
+    use_sitemaps = BooleanField('Seed from Sitemaps')
+    incremental = BooleanField('Only Report Changes Since the Last Run')
     submit = SubmitField('Start Crawling')
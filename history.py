@@ -0,0 +1,138 @@
+# history.py
+
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+
+
+def history_key(start_url, analyzer_config):
+    # Runs are comparable when they start from the same page and search the same way
+    return hashlib.sha1(repr((start_url, analyzer_config)).encode('utf-8')).hexdigest()
+
+
+def content_hash(body):
+    return hashlib.sha1(body.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class CrawlHistory:
+    # Per-URL content hashes and analyses of the last finished run of a crawl
+    # configuration, for crawls that only report what changed since then. Rows of the
+    # current run are written in batches; when the run finishes it becomes the new
+    # baseline. Pages it didn't fetch (failed, timed out, no longer linked) keep their
+    # old rows, so a transient failure doesn't make them look new next time.
+    def __init__(self, path, key, run_id, batch_size=200):
+        self.key = key
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.pending = []
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS runs (
+                config_key TEXT PRIMARY KEY,
+                run TEXT NOT NULL,
+                finished_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                config_key TEXT NOT NULL,
+                run TEXT NOT NULL,
+                url_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                analysis BLOB NOT NULL,
+                links_extracted INTEGER NOT NULL,
+                matched INTEGER NOT NULL,
+                PRIMARY KEY (config_key, run, url_key)
+            ) WITHOUT ROWID;
+        ''')
+        row = self.conn.execute('SELECT run FROM runs WHERE config_key = ?', (key,)).fetchone()
+        # A resumed run must not compare against its own partial rows
+        self.previous_run = row[0] if row and row[0] != run_id else None
+
+    def previous(self, url_key):
+        if self.previous_run is None:
+            return None
+        row = self.conn.execute(
+            'SELECT content_hash, analysis, links_extracted FROM pages WHERE config_key = ? AND run = ? AND url_key = ?',
+            (self.key, self.previous_run, url_key)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'content_hash': row[0], 'analysis': json.loads(zlib.decompress(row[1])), 'links_extracted': bool(row[2])}
+
+    def record(self, url_key, url, page_hash, analysis, links_extracted):
+        data = zlib.compress(json.dumps(analysis, ensure_ascii=False).encode('utf-8'))
+        self.pending.append((self.key, self.run_id, url_key, url, page_hash, data, int(links_extracted),
+                             int(bool(analysis['match_counts']))))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def current(self, url_key):
+        # Analysis recorded for a page earlier in this run
+        for row in reversed(self.pending):
+            if row[2] == url_key:
+                return json.loads(zlib.decompress(row[5]))
+        row = self.conn.execute(
+            'SELECT analysis FROM pages WHERE config_key = ? AND run = ? AND url_key = ?',
+            (self.key, self.run_id, url_key)
+        ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def record_alias(self, url_key, url, page_hash, original_key):
+        # A near-duplicate takes the match state of the page it copies, so which copy
+        # happens to be fetched first doesn't make a page look new or removed. Alias rows
+        # carry 'alias_of' and are never reused as the page's own analysis.
+        original = self.current(original_key)
+        if original is None:
+            return
+        self.record(url_key, url, page_hash, dict(original, alias_of=original_key), False)
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self.pending)
+        self.pending = []
+
+    def removed(self):
+        # Pages that matched in the previous run and were fetched again in this one, but
+        # no longer match; pages this run didn't fetch are not known to be gone
+        if self.previous_run is None:
+            return
+        self.flush()
+        rows = self.conn.execute('''
+            SELECT url, analysis FROM pages AS previous
+            WHERE config_key = ? AND run = ? AND matched = 1 AND EXISTS (
+                SELECT 1 FROM pages AS current
+                WHERE current.config_key = previous.config_key AND current.run = ?
+                  AND current.url_key = previous.url_key AND current.matched = 0
+            )
+        ''', (self.key, self.previous_run, self.run_id))
+        for url, data in rows:
+            yield url, json.loads(zlib.decompress(data))
+
+    def finish(self):
+        # This run becomes the baseline for the next one
+        self.flush()
+        with self.conn:
+            if self.previous_run is not None:
+                self.conn.execute('''
+                    INSERT INTO pages
+                    SELECT config_key, ?, url_key, url, content_hash, analysis, links_extracted, matched
+                    FROM pages AS previous
+                    WHERE config_key = ? AND run = ? AND NOT EXISTS (
+                        SELECT 1 FROM pages AS current
+                        WHERE current.config_key = previous.config_key AND current.run = ?
+                          AND current.url_key = previous.url_key
+                    )
+                ''', (self.run_id, self.key, self.previous_run, self.run_id))
+            self.conn.execute('INSERT OR REPLACE INTO runs (config_key, run, finished_at) VALUES (?, ?, ?)',
+                              (self.key, self.run_id, time.time()))
+            self.conn.execute('DELETE FROM pages WHERE config_key = ? AND run != ?', (self.key, self.run_id))
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,129 @@
+# host_scheduler.py
+
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+
+# Responses that mean the server wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostState:
+    def __init__(self, concurrency, delay):
+        self.limit = float(concurrency)  # Allowed parallel requests, adjusted as we go
+        self.delay = delay  # Minimum seconds between two request starts
+        self.active = 0
+        self.next_start = 0.0
+        self.blocked_until = 0.0
+        self.failures = 0  # Consecutive throttled or failed requests
+        self.latency = None  # Moving average of response latency
+        self.best_latency = None
+        self.slot_freed = asyncio.Event()
+
+
+class HostSlot:
+    # Held for the duration of one request; reports its outcome back to the scheduler
+    def __init__(self, scheduler, host):
+        self.scheduler = scheduler
+        self.host = host
+        self.status = None
+        self.retry_after = None
+        self.started = None
+
+    def record(self, status, retry_after=None):
+        self.status = status
+        self.retry_after = parse_retry_after(retry_after)
+
+    async def __aenter__(self):
+        await self.scheduler.acquire(self.host)
+        self.started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        latency = time.monotonic() - self.started
+        failed = exc_type is not None and not issubclass(exc_type, asyncio.CancelledError)
+        self.scheduler.release(self.host, self.status, latency, self.retry_after, failed)
+        return False
+
+
+class HostScheduler:
+    # Politeness and adaptive concurrency per host. Each host starts at
+    # initial_concurrency parallel requests; the limit grows additively while
+    # responses are healthy and fast, and is halved (with an exponential pause,
+    # or the server's Retry-After) on 429 and 5xx responses and connection errors.
+    def __init__(self, initial_concurrency=2, max_concurrency=10, min_concurrency=1, delay=0.0,
+                 slow_factor=3.0, latency_floor=0.25, max_backoff=300.0):
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.delay = delay
+        self.slow_factor = slow_factor
+        self.latency_floor = latency_floor  # Latencies below this never count as slow
+        self.max_backoff = max_backoff
+        self.hosts = {}
+
+    def host_state(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            concurrency = min(self.initial_concurrency, self.max_concurrency)
+            state = self.hosts[host] = HostState(concurrency, self.delay)
+        return state
+
+    def set_delay(self, host, delay):
+        # e.g. a Crawl-delay from robots.txt
+        state = self.host_state(host)
+        state.delay = max(state.delay, delay)
+
+    def slot(self, host):
+        return HostSlot(self, host)
+
+    async def acquire(self, host):
+        state = self.host_state(host)
+        while True:
+            now = time.monotonic()
+            wait = max(state.blocked_until, state.next_start) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            if state.active < int(state.limit):
+                state.active += 1
+                state.next_start = now + state.delay
+                return
+            state.slot_freed.clear()
+            await state.slot_freed.wait()
+
+    def release(self, host, status, latency, retry_after=None, failed=False):
+        state = self.host_state(host)
+        state.active -= 1
+        now = time.monotonic()
+
+        if failed or status in THROTTLE_STATUSES or (status is not None and status >= 500):
+            state.failures += 1
+            state.limit = max(self.min_concurrency, state.limit / 2)
+            backoff = retry_after if retry_after is not None else min(self.max_backoff, 2 ** state.failures)
+            state.blocked_until = max(state.blocked_until, now + min(backoff, self.max_backoff))
+        else:
+            state.failures = 0
+            state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            state.best_latency = latency if state.best_latency is None else min(state.best_latency, latency)
+            if state.latency > max(self.slow_factor * state.best_latency, self.latency_floor):
+                # The host is slowing down under our load, ease off
+                state.limit = max(self.min_concurrency, state.limit - 1)
+            else:
+                # Roughly one extra parallel request per round of healthy responses
+                state.limit = min(self.max_concurrency, state.limit + 1 / state.limit)
+
+        state.slot_freed.set()
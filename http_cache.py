@@ -0,0 +1,91 @@
+# http_cache.py
+
+import json
+import sqlite3
+import time
+import zlib
+
+
+class ResponseCache:
+    # On-disk cache of HTML responses keyed by canonical URL. Only responses carrying
+    # an ETag or Last-Modified are stored, since those are the ones a later crawl can
+    # revalidate with a conditional request. The extraction results are stored next to
+    # the body so a 304 doesn't have to re-parse the page. Least recently used entries
+    # are evicted once the cache grows past max_bytes.
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                analysis_key TEXT,
+                analysis TEXT,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_access ON responses (last_access);
+        ''')
+        self.size = self.total_size()
+
+    def total_size(self):
+        return self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def get(self, url):
+        row = self.conn.execute(
+            'SELECT body, etag, last_modified, analysis_key, analysis FROM responses WHERE url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute('UPDATE responses SET last_access = ? WHERE url = ?', (time.time(), url))
+        body, etag, last_modified, analysis_key, analysis = row
+        return {
+            'body': zlib.decompress(body).decode('utf-8'),
+            'etag': etag,
+            'last_modified': last_modified,
+            'analysis_key': analysis_key,
+            'analysis': json.loads(analysis) if analysis else None
+        }
+
+    def put(self, url, body, etag=None, last_modified=None, analysis_key=None, analysis=None):
+        if not etag and not last_modified:
+            return
+        compressed = zlib.compress(body.encode('utf-8'))
+        with self.conn:
+            previous = self.conn.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (url, body, etag, last_modified, analysis_key, analysis, size, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, compressed, etag, last_modified, analysis_key,
+                 json.dumps(analysis, ensure_ascii=False) if analysis is not None else None,
+                 len(compressed), time.time())
+            )
+        self.size += len(compressed) - (previous[0] if previous else 0)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # Other crawls may share the file, so start from the real total
+        self.size = self.total_size()
+        target = self.max_bytes * 0.9
+        while self.size > target:
+            rows = self.conn.execute('SELECT url, size FROM responses ORDER BY last_access LIMIT 100').fetchall()
+            if not rows:
+                break
+            removed = []
+            for url, size in rows:
+                if self.size <= target:
+                    break
+                removed.append((url,))
+                self.size -= size
+            with self.conn:
+                self.conn.executemany('DELETE FROM responses WHERE url = ?', removed)
+
+    def close(self):
+        self.conn.close()
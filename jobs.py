@@ -0,0 +1,140 @@
+# jobs.py
+
+import asyncio
+import aiohttp
+import logging
+import threading
+from host_scheduler import HostScheduler
+from metrics import trace_config
+
+logger = logging.getLogger(__name__)
+
+
+def open_shared_session(connection_limit=100, per_host_limit=10, dns_cache_ttl=300, request_timeout=30):
+    # One connection pool and DNS cache for many crawls; must be called on the loop
+    # that will use the session
+    conn = aiohttp.TCPConnector(limit=connection_limit, limit_per_host=per_host_limit, ttl_dns_cache=dns_cache_ttl)
+    timeout = aiohttp.ClientTimeout(total=request_timeout)
+    return aiohttp.ClientSession(connector=conn, timeout=timeout, trace_configs=[trace_config()])
+
+
+class CrawlJob:
+    def __init__(self, crawl_id, progress):
+        self.crawl_id = crawl_id
+        self.progress = progress
+        self.crawler = None
+        self.status = 'queued'
+
+
+class CrawlJobManager:
+    # Runs every crawl on one background event loop. Crawls share a connection pool,
+    # DNS cache and per-host scheduler, and at most max_concurrent_crawls run at
+    # once; the others wait their turn in submission order. A paused crawl gives up
+    # its slot and waits for one again when it is resumed.
+    def __init__(self, max_concurrent_crawls=4, connection_limit=100, per_host_limit=10, dns_cache_ttl=300,
+                 request_timeout=30):
+        self.max_concurrent_crawls = max_concurrent_crawls
+        self.connection_limit = connection_limit
+        self.per_host_limit = per_host_limit
+        self.dns_cache_ttl = dns_cache_ttl
+        self.request_timeout = request_timeout
+        self.jobs = {}
+        self.loop = None
+        self.session = None
+        self.scheduler = None
+        self.slots = None
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+
+    def start(self):
+        with self.lock:
+            if self.loop is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.run_loop, name='crawl-jobs', daemon=True).start()
+        self.ready.wait()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.setup())
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def setup(self):
+        self.session = open_shared_session(self.connection_limit, self.per_host_limit, self.dns_cache_ttl,
+                                           self.request_timeout)
+        self.scheduler = HostScheduler(max_concurrency=self.per_host_limit)
+        self.slots = asyncio.Semaphore(self.max_concurrent_crawls)
+
+    def submit(self, crawl_id, build_crawler, on_finished=None):
+        # build_crawler(**kwargs) creates the WebCrawler on the job loop; on_finished(crawler)
+        # runs in a helper thread once the crawl is over, before the job is dropped
+        self.start()
+        job = CrawlJob(crawl_id, {})
+        with self.lock:
+            self.jobs[crawl_id] = job
+        asyncio.run_coroutine_threadsafe(self.run_job(job, build_crawler, on_finished), self.loop)
+        return job
+
+    async def run_job(self, job, build_crawler, on_finished):
+        try:
+            job.crawler = build_crawler(
+                progress_dict=job.progress,
+                crawl_id=job.crawl_id,
+                session=self.session,
+                host_scheduler=self.scheduler
+            )
+            job.crawler.loop = self.loop
+            await self.slots.acquire()
+            job.status = 'running'
+            try:
+                if not job.crawler.pause_event.is_set():
+                    self.release_slot(job)  # Paused while it was queued
+                if not job.crawler.stop_crawling:
+                    await job.crawler.crawl()
+            finally:
+                if job.status == 'running':
+                    self.slots.release()
+                job.status = 'finished'
+            if on_finished is not None:
+                await self.loop.run_in_executor(None, on_finished, job.crawler)
+        except Exception as e:
+            logger.error(f"Crawl job {job.crawl_id} failed: {e}")
+        finally:
+            with self.lock:
+                self.jobs.pop(job.crawl_id, None)
+
+    def pause(self, job):
+        job.crawler.pause()
+        self.loop.call_soon_threadsafe(self.release_slot, job)
+
+    def resume(self, job):
+        asyncio.run_coroutine_threadsafe(self.resume_job(job), self.loop)
+
+    def release_slot(self, job):
+        if job.status == 'running':
+            self.slots.release()
+        if job.status in ('running', 'resuming'):
+            job.status = 'paused'
+
+    async def resume_job(self, job):
+        if job.status == 'resuming':
+            return
+        if job.status != 'paused':
+            job.crawler.resume()  # Queued crawls take their slot when their turn comes
+            return
+        job.status = 'resuming'
+        await self.slots.acquire()
+        if job.status != 'resuming':
+            self.slots.release()  # Paused again or finished while waiting
+            return
+        job.status = 'running'
+        job.crawler.resume()
+
+    def get(self, crawl_id):
+        return self.jobs.get(crawl_id)
+
+    def queue_position(self, crawl_id):
+        with self.lock:
+            queued = [job.crawl_id for job in self.jobs.values() if job.status == 'queued']
+        return queued.index(crawl_id) + 1 if crawl_id in queued else 0
@@ -0,0 +1,75 @@
+# matcher.py
+
+import re
+from collections import Counter
+
+
+class KeywordMatcher:
+    # Matches a whole keyword list in a single pass over the text. The keywords are
+    # folded into a trie and compiled into one regular expression, so the regex engine
+    # walks each position of the text once instead of once per keyword.
+    def __init__(self, keywords, word_boundary=True):
+        self.keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+        self.word_boundary = word_boundary
+        self.end = r'\b' if word_boundary else ''
+        self.pattern = self._compile()
+
+        # The regex reports only the longest keyword starting at a position, so keep
+        # track of the shorter keywords that are guaranteed to match there as well.
+        self.implied = {keyword: self._implied_keywords(keyword) for keyword in self.keywords}
+
+    def _compile(self):
+        if not self.keywords:
+            return None
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = True  # Marks the end of a keyword
+        body = self._trie_pattern(trie)
+        if self.word_boundary:
+            body = r'\b' + body
+        # A lookahead lets overlapping occurrences be reported as well
+        return re.compile(r'(?=(' + body + r'))')
+
+    def _trie_pattern(self, node):
+        branches = []
+        for char in sorted(key for key in node if key):
+            child = node[char]
+            literal = char
+            # Collapse chains of single children into one literal
+            while len(child) == 1 and '' not in child:
+                (next_char, child), = child.items()
+                literal += next_char
+            branches.append(re.escape(literal) + self._trie_pattern(child))
+        if '' in node:
+            # Ending here is tried last so the longest keyword wins
+            branches.append(self.end)
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    def _implied_keywords(self, keyword):
+        implied = []
+        for other in self.keywords:
+            if other == keyword or not keyword.startswith(other):
+                continue
+            # The leading boundary is shared with the longer keyword, only the
+            # trailing one depends on which characters follow the prefix.
+            if self.word_boundary and not re.match(re.escape(other) + r'\b', keyword):
+                continue
+            implied.append(other)
+        return implied
+
+    def count(self, text):
+        counts = Counter()
+        if self.pattern is None:
+            return {}
+        for found in self.pattern.findall(text):
+            counts[found] += 1
+        for keyword, hits in list(counts.items()):
+            for other in self.implied[keyword]:
+                counts[other] += hits
+        # Preserve the order in which the keywords were given
+        return {keyword: counts[keyword] for keyword in self.keywords if counts[keyword]}
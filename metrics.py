@@ -0,0 +1,168 @@
+# metrics.py
+
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+
+import aiohttp
+
+# Upper bounds (seconds) of the latency histogram buckets, from 100us to a minute
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    # Fixed buckets, so recording a value is a bisect and two additions
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of observations
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': list(self.buckets),
+            'counts': list(self.counts)
+        }
+
+
+class StageClock:
+    # Splits the time spent in a block of code into consecutive named stages
+    def __init__(self):
+        self.timings = {}
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self.last
+        self.last = now
+
+
+class CrawlMetrics:
+    # Per-crawl stage latencies, counters, response status codes and queue depth samples.
+    # Stages recorded by the crawler: schedule (waiting for the host scheduler), dns,
+    # connect, response (until headers arrive), download, the analysis stages reported
+    # by PageAnalyzer (extract, fingerprint, normalize, match, date, summarize) and page
+    # (everything for one URL).
+    def __init__(self, queue_sample_interval=1.0, queue_samples=600):
+        self.started = time.monotonic()
+        self.stages = {}
+        self.counters = Counter()
+        self.status_codes = Counter()
+        self.queue_depth = deque(maxlen=queue_samples)
+        self.queue_sample_interval = queue_sample_interval
+        self.last_queue_sample = None
+
+    def observe(self, stage, seconds):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram()
+        histogram.observe(seconds)
+
+    def observe_all(self, timings):
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def status(self, code):
+        self.status_codes[code] += 1
+
+    def sample_queue(self, depth):
+        now = time.monotonic()
+        if self.last_queue_sample is None or now - self.last_queue_sample >= self.queue_sample_interval:
+            self.last_queue_sample = now
+            self.queue_depth.append((round(now - self.started, 3), depth))
+
+    def snapshot(self):
+        # Plain JSON-serializable data; copies are taken first since the crawl keeps
+        # recording while another thread reads
+        return {
+            'stages': {stage: histogram.snapshot() for stage, histogram in dict(self.stages).items()},
+            'counters': dict(self.counters),
+            'status_codes': {str(code): count for code, count in dict(self.status_codes).items()},
+            'queue_depth': list(self.queue_depth)
+        }
+
+
+def prometheus_labels(labels):
+    escaped = {name: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for name, value in labels.items()}
+    return ','.join(f'{name}="{value}"' for name, value in escaped.items())
+
+
+def render_prometheus(snapshot, **labels):
+    # Prometheus text exposition format for a snapshot (live or from stored analytics)
+    base = prometheus_labels(labels)
+    joined = base + ',' if base else ''
+    lines = ['# TYPE crawler_stage_seconds histogram']
+    for stage, histogram in snapshot['stages'].items():
+        cumulative = 0
+        for bound, count in zip(histogram['buckets'] + ['+Inf'], histogram['counts']):
+            cumulative += count
+            lines.append(f'crawler_stage_seconds_bucket{{{joined}stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'crawler_stage_seconds_sum{{{joined}stage="{stage}"}} {histogram["sum"]}')
+        lines.append(f'crawler_stage_seconds_count{{{joined}stage="{stage}"}} {histogram["count"]}')
+    for name, value in snapshot['counters'].items():
+        lines.append(f'# TYPE crawler_{name}_total counter')
+        lines.append(f'crawler_{name}_total{{{base}}} {value}')
+    lines.append('# TYPE crawler_responses_total counter')
+    for code, count in snapshot['status_codes'].items():
+        lines.append(f'crawler_responses_total{{{joined}status="{code}"}} {count}')
+    if snapshot['queue_depth']:
+        lines.append('# TYPE crawler_queue_depth gauge')
+        lines.append(f'crawler_queue_depth{{{base}}} {snapshot["queue_depth"][-1][1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def trace_config():
+    # DNS and connection timings for requests made with trace_request_ctx=<CrawlMetrics>;
+    # a session may be shared by several crawls, so the metrics travel with each request
+    # DNS resolution happens inside connection setup, so each stage keeps its own start time
+    def start(stage):
+        async def record(session, context, params):
+            setattr(context, stage, time.perf_counter())
+        return record
+
+    def finish(stage):
+        async def record(session, context, params):
+            metrics = context.trace_request_ctx
+            if isinstance(metrics, CrawlMetrics):
+                metrics.observe(stage, time.perf_counter() - getattr(context, stage))
+        return record
+
+    async def dns_cache_hit(session, context, params):
+        metrics = context.trace_request_ctx
+        if isinstance(metrics, CrawlMetrics):
+            metrics.count('dns_cache_hits')
+
+    config = aiohttp.TraceConfig()
+    config.on_dns_resolvehost_start.append(start('dns'))
+    config.on_dns_resolvehost_end.append(finish('dns'))
+    config.on_dns_cache_hit.append(dns_cache_hit)
+    config.on_connection_create_start.append(start('connect'))
+    config.on_connection_create_end.append(finish('connect'))
+    return config
@@ -0,0 +1,183 @@
+# result_store.py
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class HotCache:
+    # Small LRU cache whose entries also expire after ttl seconds
+    def __init__(self, max_entries=64, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, crawl_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == crawl_id]:
+                del self.entries[key]
+
+
+class ResultStore:
+    # Finished (and paused) crawl results in SQLite, so they survive restarts and are
+    # shared by every app process using the same file. Reads are paginated; recently
+    # used analytics and pages are kept in a bounded in-memory cache, keyed by when the
+    # crawl was saved so a save made by another process is seen right away. The file is
+    # only created when first used.
+    def __init__(self, path, hot_entries=64, ttl=300, retention_days=30):
+        self.path = path
+        self.retention = retention_days * 86400 if retention_days else None
+        self.cache = HotCache(hot_entries, ttl)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.created = False
+
+    def create_tables(self, conn):
+        with self.lock:
+            if self.created:
+                return
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS crawl_results (
+                    crawl_id TEXT PRIMARY KEY,
+                    analytics TEXT NOT NULL,
+                    domains TEXT NOT NULL,
+                    result_count INTEGER NOT NULL,
+                    saved_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS crawl_results_saved ON crawl_results (saved_at);
+                CREATE TABLE IF NOT EXISTS result_items (
+                    crawl_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (crawl_id, position)
+                ) WITHOUT ROWID;
+            ''')
+            self.created = True
+
+    def connection(self):
+        # SQLite connections can't be shared between threads, so each thread gets its own
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.create_tables(conn)
+        return conn
+
+    def saved_at(self, crawl_id):
+        # Version of the stored crawl; cached reads are only valid for the same version
+        row = self.connection().execute('SELECT saved_at FROM crawl_results WHERE crawl_id = ?', (crawl_id,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, crawl_id, results, analytics, domains):
+        # results may be any iterable, so a large crawl is written without loading it all
+        count = 0
+
+        def rows():
+            nonlocal count
+            for count, result in enumerate(results, 1):
+                yield crawl_id, count - 1, json.dumps(result, ensure_ascii=False)
+
+        conn = self.connection()
+        with conn:
+            conn.execute('DELETE FROM result_items WHERE crawl_id = ?', (crawl_id,))
+            conn.executemany('INSERT INTO result_items (crawl_id, position, data) VALUES (?, ?, ?)', rows())
+            conn.execute(
+                'INSERT OR REPLACE INTO crawl_results (crawl_id, analytics, domains, result_count, saved_at) VALUES (?, ?, ?, ?, ?)',
+                (crawl_id, json.dumps(analytics, ensure_ascii=False), json.dumps(sorted(domains), ensure_ascii=False),
+                 count, time.time())
+            )
+        self.cache.invalidate(crawl_id)
+        self.purge_expired()
+
+    def purge_expired(self):
+        if self.retention is None:
+            return
+        conn = self.connection()
+        cutoff = time.time() - self.retention
+        with conn:
+            conn.execute(
+                'DELETE FROM result_items WHERE crawl_id IN (SELECT crawl_id FROM crawl_results WHERE saved_at < ?)', (cutoff,)
+            )
+            conn.execute('DELETE FROM crawl_results WHERE saved_at < ?', (cutoff,))
+
+    def summary(self, crawl_id):
+        saved_at = self.saved_at(crawl_id)
+        if saved_at is None:
+            return None
+        key = (crawl_id, saved_at, 'summary')
+        summary = self.cache.get(key)
+        if summary is None:
+            row = self.connection().execute(
+                'SELECT analytics, result_count, saved_at FROM crawl_results WHERE crawl_id = ?', (crawl_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            summary = {'analytics': json.loads(row[0]), 'result_count': row[1]}
+            if row[2] == saved_at:
+                self.cache.put(key, summary)
+        return summary
+
+    def analytics(self, crawl_id):
+        summary = self.summary(crawl_id)
+        return summary['analytics'] if summary else None
+
+    def count(self, crawl_id):
+        summary = self.summary(crawl_id)
+        return summary['result_count'] if summary else 0
+
+    def page(self, crawl_id, page=1, per_page=50):
+        saved_at = self.saved_at(crawl_id)
+        if saved_at is None:
+            return []  # Not saved yet; nothing is cached so the first save is seen
+        key = (crawl_id, saved_at, 'page', page, per_page)
+        results = self.cache.get(key)
+        if results is None:
+            results = self.read(crawl_id, (page - 1) * per_page, per_page)
+            # A save between the two reads would leave results of the newer version
+            if self.saved_at(crawl_id) == saved_at:
+                self.cache.put(key, results)
+        return results
+
+    def read(self, crawl_id, start, limit):
+        rows = self.connection().execute(
+            'SELECT data FROM result_items WHERE crawl_id = ? AND position >= ? ORDER BY position LIMIT ?',
+            (crawl_id, start, limit)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def iter_results(self, crawl_id, batch=500):
+        # Walks all results a batch at a time, for exports
+        start = 0
+        while True:
+            results = self.read(crawl_id, start, batch)
+            if not results:
+                return
+            yield from results
+            start += len(results)
+
+    def domains(self, crawl_id):
+        row = self.connection().execute('SELECT domains FROM crawl_results WHERE crawl_id = ?', (crawl_id,)).fetchone()
+        return json.loads(row[0]) if row else []
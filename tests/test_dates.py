@@ -0,0 +1,44 @@
+# tests/test_dates.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dates import extract_date  # noqa: E402
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('سه‌شنبه ۱۲ مهر ۱۴۰۲', '2023-10-04'),
+    ('١٤٠٢/٠٧/١٢', '2023-10-04'),
+    ('Published 2024-01-15T10:00', '2024-01-15'),
+    ('January 5, 2024', '2024-01-05'),
+    ('15 Jan. 2024', '2024-01-15'),
+    ('۱۵ ژانویه ۲۰۲۴', '2024-01-15'),
+    ('12 دي 1402', '2024-01-02'),
+    ('1402/13/40 then 1401/02/03', '2022-04-23'),
+    ('tel 0912-12-12 then 1402/07/12', '2023-10-04'),
+])
+def test_dates_in_text(text, expected):
+    assert extract_date(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    'nothing 20240115',
+    'tel 0912-12-12',
+    'code 123456/1/2',
+    'id 2024-01-150',
+    'order 12 May 20245',
+    '1 مهر 1234',
+    'March 3, 2150',
+])
+def test_numbers_that_are_not_dates(text):
+    assert extract_date(text) is None
+
+
+def test_markup_hints_come_first():
+    html_content = '<html><head><meta property="article:published_time" content="2023-05-06T07:00:00Z"></head>'
+    assert extract_date('text 1401/02/03', html_content) == '2023-05-06'
+    assert extract_date('text', '<body><time datetime="2022-02-02">x</time>') == '2022-02-02'
@@ -0,0 +1,65 @@
+# tests/test_exports.py
+
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exports import MATCH_HEADER, match_row, stream_export  # noqa: E402
+
+RESULTS = [
+    {'url': 'http://example.com/a', 'matches': ['کتاب', 'news'], 'match_counts': {'کتاب': 3, 'news': 1},
+     'date': None, 'summary': 'خلاصه'},
+    {'url': 'http://example.com/b', 'matches': [], 'match_counts': {}, 'date': None, 'summary': '',
+     'alias_of': 'http://example.com/a'},
+]
+
+
+def export(file_format, compress=False):
+    chunks, _, _ = stream_export(MATCH_HEADER, (match_row(result) for result in RESULTS), file_format, compress,
+                                 iter(RESULTS))
+    data = b''.join(chunks)
+    return (gzip.decompress(data) if compress else data).decode('utf-8')
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_jsonl_writes_the_result_records(compress):
+    lines = export('jsonl', compress).splitlines()
+    assert [json.loads(line) for line in lines] == RESULTS
+
+
+def test_csv_rows():
+    rows = list(csv.reader(io.StringIO(export('csv'))))
+    assert rows == [
+        MATCH_HEADER,
+        ['http://example.com/a', 'کتاب, news', 'Not found', 'خلاصه', ''],
+        ['http://example.com/b', '', '', '', 'http://example.com/a'],
+    ]
+
+
+def test_jsonl_without_records_uses_the_rows():
+    chunks, _, _ = stream_export(['Domain'], iter([['example.com']]), 'jsonl')
+    assert b''.join(chunks) == b'{"domain": "example.com"}\n'
+
+
+def test_download_route(tmp_path, monkeypatch):
+    monkeypatch.setenv('RESULT_STORE_PATH', str(tmp_path / 'results.db'))
+    sys.modules.pop('app', None)
+    import app
+    try:
+        app.result_store.save('exported', RESULTS, {'total_pages': 2}, {'example.com'})
+        client = app.app.test_client()
+        with client.session_transaction() as session:
+            session['crawl_id'] = 'exported'
+        response = client.get('/download/matches?format=jsonl')
+        assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == RESULTS
+        response = client.get('/download/dates?format=jsonl')
+        assert response.get_data(as_text=True) == '{"url": "http://example.com/a", "date": null}\n'
+    finally:
+        sys.modules.pop('app', None)
@@ -0,0 +1,29 @@
+# tests/test_extraction.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_corpus  # noqa: E402
+from extraction import EXTRACTORS, extract_page  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    return generate_corpus()
+
+
+@pytest.mark.parametrize('backend', ['selectolax', 'lxml'])
+@pytest.mark.parametrize('extract_links', [True, False])
+def test_backend_matches_beautifulsoup(corpus, backend, extract_links):
+    if backend not in EXTRACTORS:
+        pytest.skip(f'{backend} is not installed')
+    extractor = EXTRACTORS[backend]()
+    reference = EXTRACTORS['bs4']()
+    mismatches = [index for index, html_content in enumerate(corpus)
+                  if extract_page(extractor, html_content, extract_links)
+                  != extract_page(reference, html_content, extract_links)]
+    assert mismatches == []
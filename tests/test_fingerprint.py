@@ -0,0 +1,65 @@
+# tests/test_fingerprint.py
+
+import asyncio
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_site import free_port  # noqa: E402
+from crawl_state import CrawlStateStore  # noqa: E402
+from crawler import WebCrawler  # noqa: E402
+from fingerprint import NearDuplicateIndex, simhash  # noqa: E402
+
+ARTICLE = ' '.join(f'کتاب شماره {i} در نمایشگاه امسال معرفی شد' for i in range(10))
+
+
+def test_index_forgets_oldest_pages():
+    index = NearDuplicateIndex(max_distance=3, max_pages=2)
+    other = [simhash(' '.join(f'{word}{i}' for i in range(30))) for word in ('alpha', 'beta', 'gamma')]
+    for url, fingerprint in zip('abc', other):
+        assert index.find_or_add(url, fingerprint) is None
+    assert list(index.pages) == ['b', 'c']
+    assert index.find(other[0]) is None
+    assert index.find(other[2]) == 'c'
+    assert sum(len(entries) for table in index.tables for entries in table.values()) == 2 * len(index.bands)
+
+
+async def crawl_with_copies(state_path):
+    async def page(request):
+        index = int(request.match_info['index'])
+        if index == 0:
+            links = ''.join(f'<a href="/p/{i}">{i}</a>' for i in range(1, 4))
+            return web.Response(text=f'<html><body><p>index</p>{links}</body></html>', content_type='text/html')
+        return web.Response(text=f'<html><body><p>{ARTICLE}</p></body></html>', content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/p/{index}', page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    try:
+        crawler = WebCrawler(f'http://127.0.0.1:{port}/p/0', ['کتاب'], max_depth=1, workers=1,
+                             state_path=state_path, crawl_id='copies')
+        results, analytics, _ = await crawler.crawl()
+    finally:
+        await runner.cleanup()
+    return port, list(results), analytics
+
+
+def test_aliases_are_separate_checkpointed_records(tmp_path):
+    state_path = str(tmp_path / 'state.db')
+    port, results, analytics = asyncio.run(crawl_with_copies(state_path))
+    original = f'http://127.0.0.1:{port}/p/1'
+    assert analytics['duplicate_pages'] == 2
+    assert results[0]['url'] == original and 'alias_of' not in results[0]
+    assert [(result['url'].rsplit('/', 1)[-1], result['alias_of']) for result in results[1:]] == [
+        ('2', original), ('3', original)]
+    store = CrawlStateStore(state_path, 'copies')
+    try:
+        assert store.read_results(0, 10) == results
+    finally:
+        store.close()
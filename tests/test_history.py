@@ -0,0 +1,81 @@
+# tests/test_history.py
+
+import asyncio
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_site import free_port  # noqa: E402
+from crawler import WebCrawler  # noqa: E402
+
+ARTICLE = ' '.join(['کتاب تازه درباره اقتصاد و فرهنگ ایران منتشر شد'] * 5)
+OTHER_ARTICLE = ' '.join(f'کتاب شماره {i} در نمایشگاه امسال' for i in range(10))
+
+
+class Site:
+    # /p/0 links to the other pages in a configurable order; /p/1 and /p/2 are the same
+    # article, /p/3 can be made unreadable or stop matching
+    def __init__(self):
+        self.order = [1, 2, 3]
+        self.page_3 = 'match'
+
+    async def page(self, request):
+        index = int(request.match_info['index'])
+        if index == 0:
+            links = ''.join(f'<a href="/p/{i}">{i}</a>' for i in self.order)
+            return web.Response(text=f'<html><body><p>index</p>{links}</body></html>', content_type='text/html')
+        if index == 3 and self.page_3 == 'binary':
+            return web.Response(body=b'\x00', content_type='application/octet-stream')
+        if index == 3:
+            text = 'چیز دیگری' if self.page_3 == 'no match' else OTHER_ARTICLE
+        else:
+            text = ARTICLE
+        return web.Response(text=f'<html><body><p>{text}</p></body></html>', content_type='text/html')
+
+
+async def run_crawls(history_path, steps):
+    site = Site()
+    app = web.Application()
+    app.router.add_get('/p/{index}', site.page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    runs = []
+    try:
+        for number, change_site in enumerate(steps):
+            change_site(site)
+            crawler = WebCrawler(f'http://127.0.0.1:{port}/p/0', ['کتاب'], max_depth=1, workers=1,
+                                 history_path=history_path, crawl_id=f'run-{number}')
+            results, analytics, _ = await crawler.crawl()
+            runs.append(({result['url'].rsplit('/', 1)[-1]: result.get('change', 'alias') for result in results},
+                         analytics['changes']))
+    finally:
+        await runner.cleanup()
+    return runs
+
+
+def test_duplicates_and_unfetched_pages_are_not_removed(tmp_path):
+    def first(site):
+        pass
+
+    def reordered_and_unreadable(site):
+        site.order = [2, 1, 3]
+        site.page_3 = 'binary'
+
+    def no_longer_matching(site):
+        site.page_3 = 'no match'
+
+    runs = asyncio.run(run_crawls(str(tmp_path / 'history.db'),
+                                  [first, reordered_and_unreadable, no_longer_matching]))
+
+    # /p/2 is a near-duplicate of /p/1 and is listed as its alias
+    assert runs[0][0] == {'1': 'new', '2': 'alias', '3': 'new'}
+    # The other copy is now fetched first and /p/3 can't be read: nothing changed
+    assert runs[1][0] == {}
+    assert 'removed' not in runs[1][1] and 'new' not in runs[1][1]
+    # /p/3 kept its baseline through the failed run and is removed once it stops matching
+    assert runs[2][0] == {'3': 'removed'}
@@ -0,0 +1,29 @@
+# tests/test_host_scheduler.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from host_scheduler import HostScheduler  # noqa: E402
+
+
+@pytest.mark.parametrize('status', [429, 500, 502, 503, 504])
+def test_error_responses_halve_concurrency(status):
+    scheduler = HostScheduler(initial_concurrency=4, max_concurrency=10)
+    state = scheduler.host_state('example.com')
+    state.active = 1
+    scheduler.release('example.com', status, 0.1)
+    assert state.limit == 2
+    assert state.failures == 1
+
+
+def test_healthy_responses_raise_concurrency():
+    scheduler = HostScheduler(initial_concurrency=4, max_concurrency=10)
+    state = scheduler.host_state('example.com')
+    state.active = 1
+    scheduler.release('example.com', 200, 0.1)
+    assert state.limit == 4.25
+    assert state.failures == 0
@@ -0,0 +1,50 @@
+# tests/test_jobs.py
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_site import FixtureSite  # noqa: E402
+from crawler import WebCrawler  # noqa: E402
+from jobs import CrawlJobManager  # noqa: E402
+
+SEARCH_WORDS = ['کتاب', 'python']
+
+
+@pytest.fixture(scope='module')
+def site():
+    with FixtureSite(pages=80, fanout=4, words=80, latency=0.01) as site:
+        yield site
+
+
+def wait_until(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_paused_crawl_gives_up_its_slot(site):
+    manager = CrawlJobManager(max_concurrent_crawls=1)
+    finished = []
+
+    def build_crawler(**kwargs):
+        return WebCrawler(site.start_url, SEARCH_WORDS, max_depth=20, **kwargs)
+
+    def on_finished(crawler):
+        finished.append(crawler.crawl_id)
+
+    first = manager.submit('first', build_crawler, on_finished)
+    wait_until(lambda: first.status == 'running' and first.crawler.total_pages > 0)
+    manager.pause(first)
+    manager.submit('second', build_crawler, on_finished)
+    # The queued crawl runs to the end while the first one is paused
+    wait_until(lambda: finished == ['second'])
+    assert first.status == 'paused'
+
+    manager.resume(first)
+    wait_until(lambda: finished == ['second', 'first'])
@@ -0,0 +1,37 @@
+# tests/test_result_store.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_store import ResultStore  # noqa: E402
+
+
+def results(count, label):
+    return [{'url': f'http://example.com/{label}/{i}', 'matches': [label]} for i in range(count)]
+
+
+def test_file_is_created_on_first_use(tmp_path):
+    path = tmp_path / 'results.db'
+    store = ResultStore(str(path))
+    assert not path.exists()
+    assert store.page('missing') == []
+    assert path.exists()
+
+
+def test_saves_by_another_process_are_seen(tmp_path):
+    # Two stores on one file stand in for two app worker processes
+    path = str(tmp_path / 'results.db')
+    reader, writer = ResultStore(path), ResultStore(path)
+
+    assert reader.page('crawl') == []
+    assert reader.summary('crawl') is None
+    writer.save('crawl', results(3, 'paused'), {'total_pages': 5}, set())
+    assert [result['matches'] for result in reader.page('crawl')] == [['paused']] * 3
+    assert reader.analytics('crawl') == {'total_pages': 5}
+
+    writer.save('crawl', results(4, 'done'), {'total_pages': 9}, set())
+    assert [result['matches'] for result in reader.page('crawl')] == [['done']] * 4
+    assert reader.analytics('crawl') == {'total_pages': 9}
+    assert reader.count('crawl') == 4
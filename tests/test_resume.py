@@ -0,0 +1,141 @@
+# tests/test_resume.py
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_site import FixtureSite  # noqa: E402
+from crawl_state import load_checkpoint  # noqa: E402
+from crawler import WebCrawler  # noqa: E402
+
+SEARCH_WORDS = ['کتاب', 'python']
+# Deep enough to reach every page whatever order they are crawled in
+MAX_DEPTH = 20
+
+
+@pytest.fixture(scope='module')
+def site():
+    with FixtureSite(pages=80, fanout=4, words=80, latency=0.01) as site:
+        yield site
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    # app reads its paths from the environment on import
+    monkeypatch.setenv('CRAWL_STATE_PATH', str(tmp_path / 'state.db'))
+    monkeypatch.setenv('RESULT_STORE_PATH', str(tmp_path / 'results.db'))
+    monkeypatch.setenv('CRAWL_HISTORY_PATH', str(tmp_path / 'history.db'))
+    sys.modules.pop('app', None)
+    import app
+    yield app
+    sys.modules.pop('app', None)
+
+
+async def crawl_until(crawler, pages):
+    # Stops the crawl once it has fetched the given number of pages
+    task = asyncio.create_task(crawler.crawl())
+    while crawler.total_pages < pages and not task.done():
+        await asyncio.sleep(0.005)
+    crawler.stop()
+    return await task
+
+
+def crawl_in_process(start_url, state_path, crawl_id, checkpoint_interval):
+    crawler = WebCrawler(start_url, SEARCH_WORDS, max_depth=MAX_DEPTH, state_path=state_path, crawl_id=crawl_id,
+                         checkpoint_interval=checkpoint_interval)
+    asyncio.run(crawler.crawl())
+
+
+def wait_for_job(job_manager, crawl_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while job_manager.get(crawl_id) is not None:
+        assert time.monotonic() < deadline, 'crawl did not finish'
+        time.sleep(0.05)
+
+
+def test_stopped_crawl_resumes_through_route(site, app_module):
+    _, _, all_links = asyncio.run(WebCrawler(site.start_url, SEARCH_WORDS, max_depth=MAX_DEPTH).crawl())
+    expected_pages = len(set(all_links) | {site.start_url})
+
+    state_path = app_module.CRAWL_STATE_PATH
+    crawler = WebCrawler(site.start_url, SEARCH_WORDS, max_depth=MAX_DEPTH, state_path=state_path,
+                         crawl_id='resumed-crawl', workers=3, max_page_bytes=1024 * 1024)
+    asyncio.run(crawl_until(crawler, 10))
+    saved = load_checkpoint(state_path, 'resumed-crawl')
+    assert saved['status'] == 'stopped'
+    assert saved['config']['workers'] == 3 and saved['config']['max_page_bytes'] == 1024 * 1024
+    assert saved['stats']['total_pages'] < expected_pages
+
+    client = app_module.app.test_client()
+    response = client.get('/resume/resumed-crawl')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/progress')
+    wait_for_job(app_module.job_manager, 'resumed-crawl')
+
+    saved = load_checkpoint(state_path, 'resumed-crawl')
+    assert saved['status'] == 'completed'
+    assert saved['stats']['total_pages'] == expected_pages
+    assert app_module.result_store.analytics('resumed-crawl')['total_pages'] == expected_pages
+
+
+def test_paused_crawl_fetches_nothing_new(site):
+    async def crawl_paused():
+        crawler = WebCrawler(site.start_url, SEARCH_WORDS, max_depth=MAX_DEPTH)
+        task = asyncio.create_task(crawler.crawl())
+        while crawler.total_pages < 1:
+            await asyncio.sleep(0.001)
+        # The other workers are waiting for the links of the start page
+        crawler.pause()
+        await asyncio.sleep(0.3)
+        paused_pages = crawler.total_pages
+        crawler.resume()
+        _, analytics, _ = await task
+        return paused_pages, analytics['total_pages']
+
+    paused_pages, total_pages = asyncio.run(crawl_paused())
+    assert paused_pages == 1
+    assert total_pages > 1
+
+
+def test_finished_crawl_with_state_returns_links_and_results(site, tmp_path):
+    expected_results, _, expected = asyncio.run(WebCrawler(site.start_url, SEARCH_WORDS, max_depth=MAX_DEPTH).crawl())
+    crawler = WebCrawler(site.start_url, SEARCH_WORDS, max_depth=MAX_DEPTH, state_path=str(tmp_path / 'state.db'))
+    results, analytics, links = asyncio.run(crawler.crawl())
+    assert sorted(links) == sorted(expected)
+    assert analytics['total_links'] == len(links)
+    # Checkpointed results are only kept in the store
+    assert crawler.results == []
+    assert sorted(result['url'] for result in results) == sorted(result['url'] for result in expected_results)
+
+
+def test_killed_crawl_resumes_without_losing_pages(tmp_path):
+    with FixtureSite(pages=600, fanout=4, words=80, latency=0.04) as site:
+        results, _, all_links = asyncio.run(WebCrawler(site.start_url, SEARCH_WORDS, max_depth=MAX_DEPTH).crawl())
+        expected_pages = len(set(all_links) | {site.start_url})
+
+        # Killed half a checkpoint interval after its state was first saved, by which time
+        # more than a write batch of pages has been finished
+        state_path = str(tmp_path / 'state.db')
+        process = multiprocessing.get_context('spawn').Process(
+            target=crawl_in_process, args=(site.start_url, state_path, 'killed-crawl', 1.0))
+        process.start()
+        deadline = time.monotonic() + 60
+        while not os.path.exists(state_path) or load_checkpoint(state_path, 'killed-crawl') is None:
+            assert time.monotonic() < deadline and process.is_alive(), 'crawl was not checkpointed'
+            time.sleep(0.01)
+        time.sleep(0.5)
+        process.kill()
+        process.join()
+        assert load_checkpoint(state_path, 'killed-crawl')['status'] == 'running'
+
+        crawler = WebCrawler.from_checkpoint(state_path, 'killed-crawl')
+        resumed_results, analytics, _ = asyncio.run(crawler.crawl())
+
+    assert analytics['total_pages'] == expected_pages
+    assert sorted(result['url'] for result in resumed_results) == sorted(result['url'] for result in results)
@@ -0,0 +1,46 @@
+# urls.py
+
+import re
+from fnmatch import translate
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track where a visitor came from
+DEFAULT_STRIP_PARAMS = ['utm_*', 'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid',
+                        '_ga', '_gl', '_hsenc', '_hsmi', 'igshid', 'ref_src']
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class UrlCanonicalizer:
+    # Reduces URLs that point at the same page to one key: lowercased scheme and host,
+    # no default port, fragment or trailing slash, sorted query without tracking params.
+    # strip_params takes glob patterns matched against lowercased parameter names.
+    def __init__(self, strip_params=None):
+        self.strip_params = DEFAULT_STRIP_PARAMS if strip_params is None else list(strip_params)
+        self.strip_pattern = re.compile('|'.join(translate(p.lower()) for p in self.strip_params)) if self.strip_params else None
+
+    def canonicalize(self, url):
+        try:
+            parts = urlsplit(url.strip())
+            port = parts.port
+        except ValueError:
+            return url
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').rstrip('.')
+        if ':' in host:
+            host = f'[{host}]'  # IPv6 literal
+        netloc = host
+        if parts.username is not None:
+            netloc = parts.netloc.rpartition('@')[0] + '@' + netloc
+        if port is not None and port != DEFAULT_PORTS.get(scheme):
+            netloc += f':{port}'
+
+        path = parts.path or '/'
+        if len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/') or '/'
+
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        if self.strip_pattern is not None:
+            query = [(key, value) for key, value in query if not self.strip_pattern.match(key.lower())]
+        query.sort()
+        return urlunsplit((scheme, netloc, path, urlencode(query), ''))